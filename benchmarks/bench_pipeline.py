@@ -0,0 +1,164 @@
+"""Pipeline benchmarks for tts_V5.py, run offline against the stub backend.
+
+Generated scripts of several lengths and pause densities are pushed through
+each stage of the pipeline:
+
+- parse:      parse_dialogue over the whole script
+- split:      split_pause_segments on every parsed line
+- silence:    silence_samples for every [pause_X] tag (memo cleared first)
+- merge:      merge_wav_files over one pre-rendered WAV per line
+- synthesis:  generate_individual_audios without merging (scheduling, decode, line writes)
+- end_to_end: generate_individual_audios with the merged output
+
+Every case runs in a fresh interpreter, so peak RSS belongs to that case alone.
+Results are JSON for comparison across commits.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--sizes 10 1000 10000] [--densities 0 1] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_DIR)
+
+CASES = ["parse", "split", "silence", "merge", "synthesis", "end_to_end"]
+WORDS = ("the quick brown fox jumps over a lazy dog while students listen carefully to "
+         "every question and answer in this short dialogue about school travel and weather").split()
+# Short stub tones keep 10k-line outputs to a manageable size while still exercising every stage
+STUB_SECONDS_PER_CHAR = 0.002
+
+def generate_script(num_lines, pause_density, seed=0):
+    """Builds a deterministic A-F dialogue with on average `pause_density` pause tags per line."""
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(num_lines):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(3, 20))]
+        pauses = int(pause_density) + (rng.random() < pause_density - int(pause_density))
+        for _ in range(pauses):
+            words.insert(rng.randint(1, len(words)), f"[pause_{rng.choice((0.5, 1, 1.5, 2))}]")
+        lines.append(f"{rng.choice('ABCDEF')}: {' '.join(words)}")
+    return "\n".join(lines)
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def run_case(case, num_lines, pause_density, latency):
+    import tts_V5
+    # Keep one-time library imports out of the timed region
+    tts_V5.warm_audio_imports()
+
+    speaker_voices = {s: tts_V5.resolve_voice_id(name) for s, name in tts_V5.DEFAULT_SPEAKER_VOICES.items()}
+    parsed, _ = tts_V5.parse_dialogue(generate_script(num_lines, pause_density), speaker_voices)
+    segments = [tts_V5.split_pause_segments(text) for _, text, _ in parsed]
+    segment_count = sum(len(line) for line in segments)
+    backend = tts_V5.create_backend("stub", latency=latency, seconds_per_char=STUB_SECONDS_PER_CHAR)
+    work_dir = tempfile.mkdtemp(prefix="tts_bench_")
+    metrics = tts_V5.JobMetrics()
+    try:
+        if case == "merge":
+            # Pre-render one WAV per line outside the timed region
+            line_files = []
+            for i, (_, text, voice_id) in enumerate(parsed):
+                path = os.path.join(work_dir, f"{i}.wav")
+                with open(path, "wb") as f:
+                    f.write(backend.render_tone(text, voice_id))
+                line_files.append(path)
+
+        started = time.perf_counter()
+        if case == "parse":
+            tts_V5.parse_dialogue(generate_script(num_lines, pause_density), speaker_voices)
+        elif case == "split":
+            for _, text, _ in parsed:
+                tts_V5.split_pause_segments(text)
+        elif case == "silence":
+            tts_V5.silence_samples.cache_clear()
+            for line in segments:
+                for seg_type, value in line:
+                    if seg_type == "pause":
+                        tts_V5.silence_samples(value)
+        elif case == "merge":
+            tts_V5.merge_wav_files(line_files, os.path.join(work_dir, "merged.wav"), metrics=metrics)
+        else:
+            asyncio.run(tts_V5.generate_individual_audios(
+                parsed, output_dir=work_dir, merge_files=(case == "end_to_end"), delete_singles=False,
+                use_cache=False, backend=backend, max_concurrency=16, metrics=metrics))
+        wall = time.perf_counter() - started
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "case": case,
+        "lines": num_lines,
+        "pause_density": pause_density,
+        "segments": segment_count,
+        "wall_s": round(wall, 4),
+        "segments_per_s": round(segment_count / wall, 1) if wall > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+        # Per-stage breakdown for the merge, synthesis and end_to_end cases
+        "stages": metrics.summary()["stages"],
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 1000, 10000], help="Script lengths in lines")
+    parser.add_argument("--densities", nargs="+", type=float, default=[0.0, 1.0], help="Average pause tags per line")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub backend latency per request in seconds")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    parser.add_argument("--run-case", nargs=3, metavar=("CASE", "LINES", "DENSITY"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        case, lines, density = args.run_case
+        print(json.dumps(run_case(case, int(lines), float(density), args.latency)))
+        return 0
+
+    results = {"commit": git_commit(), "python": sys.version.split()[0], "latency": args.latency, "results": []}
+    for num_lines in args.sizes:
+        for density in args.densities:
+            for case in args.cases:
+                proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--latency", str(args.latency),
+                                       "--run-case", case, str(num_lines), str(density)],
+                                      capture_output=True, text=True)
+                if proc.returncode != 0:
+                    lines = proc.stderr.strip().splitlines()
+                    result = {"case": case, "lines": num_lines, "pause_density": density,
+                              "error": lines[-1] if lines else f"exit code {proc.returncode}"}
+                else:
+                    result = json.loads(proc.stdout.strip().splitlines()[-1])
+                results["results"].append(result)
+                print(f"{case:>10} lines={num_lines:<6} pauses/line={density:<4} "
+                      f"wall={result.get('wall_s')}s seg/s={result.get('segments_per_s')} "
+                      f"rss={result.get('peak_rss_mb')}MB", file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 0 if all("error" not in r for r in results["results"]) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Startup-time benchmark for tts_V5.py.
+
+Each measurement runs in a fresh interpreter so module caches never hide a
+cold-start regression:
+
+- import:          `import tts_V5`
+- window_ready:    import + building the Tk window until it is drawn (needs a display)
+- first_synthesis: import + one synthesis request decoded to PCM (needs network access
+                   with the default edge backend; use --backend stub offline)
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 5] [--output startup.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Each probe prints the seconds elapsed since just before `import tts_V5`
+PROBES = {
+    "import": """
+import time; t0 = time.perf_counter()
+import tts_V5
+print(time.perf_counter() - t0)
+""",
+    "window_ready": """
+import time; t0 = time.perf_counter()
+import tts_V5
+import tkinter as tk
+root = tk.Tk()
+tts_V5.get_dialogue_from_gui(root, tts_V5.start_gui_generation, tts_V5.job_manager.cancel)
+root.update()
+print(time.perf_counter() - t0)
+root.destroy()
+""",
+    "first_synthesis": """
+import time; t0 = time.perf_counter()
+import asyncio, tts_V5
+backend = tts_V5.create_backend({backend!r})
+data = asyncio.run(backend.synthesize("Hello.", tts_V5.FALLBACK_VOICE_ID))
+if tts_V5.AUDIO_PROCESSING_AVAILABLE:
+    tts_V5.decode_audio(data)
+print(time.perf_counter() - t0)
+""",
+}
+
+# Default budgets in milliseconds (median); exceeding one makes the run exit non-zero
+DEFAULT_BUDGETS_MS = {"import": 300, "window_ready": 1500, "first_synthesis": 5000}
+
+def run_probe(code):
+    proc = subprocess.run([sys.executable, "-c", f"import sys; sys.path.insert(0, {REPO_DIR!r})\n{code}"],
+                          cwd=REPO_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        lines = proc.stderr.strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else f"exit code {proc.returncode}")
+    return float(proc.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh-process runs per probe (default: %(default)s)")
+    parser.add_argument("--probes", nargs="+", choices=sorted(PROBES), default=list(PROBES))
+    parser.add_argument("--backend", default="edge", help="Backend for the first_synthesis probe (default: %(default)s)")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    for name, budget in DEFAULT_BUDGETS_MS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}-budget-ms", type=float, default=budget, dest=f"{name}_budget")
+    args = parser.parse_args()
+
+    results = {"python": sys.version.split()[0], "repeat": args.repeat, "backend": args.backend, "probes": {}}
+    over_budget = False
+    for name in args.probes:
+        budget_ms = getattr(args, f"{name}_budget")
+        try:
+            code = PROBES[name].replace("{backend!r}", repr(args.backend))
+            samples_ms = [run_probe(code) * 1000 for _ in range(args.repeat)]
+        except RuntimeError as e:
+            # No display or no network on this machine: report it rather than failing the whole run
+            results["probes"][name] = {"status": "skipped", "reason": str(e)}
+            continue
+        median_ms = statistics.median(samples_ms)
+        within_budget = median_ms <= budget_ms
+        over_budget = over_budget or not within_budget
+        results["probes"][name] = {
+            "status": "ok" if within_budget else "over_budget",
+            "median_ms": round(median_ms, 1),
+            "min_ms": round(min(samples_ms), 1),
+            "max_ms": round(max(samples_ms), 1),
+            "budget_ms": budget_ms,
+        }
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 1 if over_budget else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,15 +2,27 @@ import sys
 import asyncio
 import os
 import datetime
-import tkinter as tk
-from tkinter import scrolledtext, messagebox, filedialog
-from tkinter import ttk  # Import ttk for themed widgets
+import time
 import threading
 import wave
-import numpy as np
-import tempfile
+import functools
+import struct
+import concurrent.futures
+import math
+import contextlib
+import itertools
+import random
+import zlib
+import importlib
+import importlib.util
 import re
-import shutil 
+import io
+import tempfile
+import json
+import hashlib
+import difflib
+import unicodedata
+from xml.sax.saxutils import escape as xml_escape, unescape as xml_unescape
 
 # Suppress Tkinter image warnings
 try:
@@ -18,28 +30,102 @@ try:
 except:
     pass
 
-# Optional audio processing libraries
-try:
-    import librosa
-    import soundfile as sf
-    AUDIO_PROCESSING_AVAILABLE = True
-except ImportError:
-    AUDIO_PROCESSING_AVAILABLE = False
-    print("Warning: Audio processing libraries (librosa, soundfile) are missing. [pause_X] segments will not be generated, and WAV merging may be limited.")
+class _LazyModule:
+    """Stands in for a module and imports it on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+# Heavy audio libraries (librosa pulls in numba/scipy) load on first use or from
+# warm_audio_imports() once the window is up, so they stay off the startup path
+np = _LazyModule("numpy")
+librosa = _LazyModule("librosa")
+sf = _LazyModule("soundfile")
+scipy_signal = _LazyModule("scipy.signal")
+soxr = _LazyModule("soxr")
+edge_tts = _LazyModule("edge_tts")
+pygame = _LazyModule("pygame")
+
+# Optional audio processing libraries (find_spec checks availability without importing)
+AUDIO_PROCESSING_AVAILABLE = all(importlib.util.find_spec(name) is not None for name in ("librosa", "soundfile"))
+# libsoxr (installed with librosa >= 0.10) is the fastest resampler; scipy's polyphase filter is the fallback
+SOXR_AVAILABLE = importlib.util.find_spec("soxr") is not None
+if not AUDIO_PROCESSING_AVAILABLE:
+    print("Warning: Audio processing libraries (librosa, soundfile) are missing. Lines will be saved as raw Edge-TTS MP3 data, and WAV merging may be limited.", file=sys.stderr)
+
+# Optional playback library for the preview
+PLAYBACK_AVAILABLE = importlib.util.find_spec("pygame") is not None
 
 # VENV check (retained for developer warning)
 expected_venv_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'venv311'))
 python_exe_in_venv = os.path.join(expected_venv_path, 'Scripts', 'python.exe')
 if expected_venv_path not in sys.executable:
-    print("Warning: You do not seem to be using the project's virtual environment.")
-    print(f"Recommended command: {python_exe_in_venv} {os.path.abspath(__file__)}")
-    print()
+    print("Warning: You do not seem to be using the project's virtual environment.", file=sys.stderr)
+    print(f"Recommended command: {python_exe_in_venv} {os.path.abspath(__file__)}", file=sys.stderr)
+    print(file=sys.stderr)
 
-import edge_tts
+def warm_audio_imports():
+    """Imports the heavy audio libraries ahead of the first job; safe to run on a background thread."""
+    modules = ["numpy", "edge_tts"] + (["soundfile", "librosa"] if AUDIO_PROCESSING_AVAILABLE else [])
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"Background import of {name} failed: {e}", file=sys.stderr)
 
 # --- Global Variables ---
-global_stop_event = threading.Event()
-is_generating = False 
+# Number of Edge-TTS requests kept in flight at once by generate_individual_audios
+DEFAULT_MAX_CONCURRENCY = 4
+# Edge-TTS request rate cap (token bucket) and retries per segment on transient errors
+DEFAULT_REQUEST_RATE = 8.0
+DEFAULT_MAX_RETRIES = 5
+# How quickly a STOP interrupts a retry backoff, in seconds
+STOP_POLL_INTERVAL = 0.1
+# Number of dialogue jobs the JobManager runs at once; further submissions wait in its queue
+DEFAULT_MAX_PARALLEL_JOBS = 3
+# Sample rate of every decoded buffer and written WAV file
+DEFAULT_SAMPLE_RATE = 24000
+# Frames per read/write when streaming audio into a merged file
+MERGE_BLOCK_FRAMES = 65536
+# Seconds of out-of-order line audio the streaming merged writer keeps in memory; further lines that
+# finish ahead of an earlier, slower one are spilled to a temporary file until their turn comes
+WRITER_BUFFER_SECONDS = 30
+# Lines of a job being rendered at once (at least twice the request budget, so requests never starve);
+# bounds the synthesized and decoded audio held in memory however long the script is
+DEFAULT_RENDER_WINDOW = 32
+# Threads filling a preallocated merged WAV; each copies whole inputs into disjoint regions
+DEFAULT_MERGE_WORKERS = min(4, os.cpu_count() or 1)
+# Canonical 44-byte PCM WAV header (RIFF + fmt + data chunk headers)
+WAV_HEADER_BYTES = 44
+# Input subtypes the preallocated merge can read as int16 (libsndfile does not scale float samples to int16)
+INTEGER_PCM_SUBTYPES = ("PCM_16", "PCM_24", "PCM_32")
+# Worker threads for decoding, resampling, encoding and merging off the event loop; numpy, soundfile
+# and libsoxr release the GIL for the heavy work, so threads scale without copying buffers between processes
+DEFAULT_AUDIO_WORKERS = os.cpu_count() or 1
+# Loudness normalization (ITU-R BS.1770 style): 400 ms gating blocks every 100 ms, absolute and relative gates
+DEFAULT_TARGET_LUFS = -16.0
+LOUDNESS_BLOCK_SECONDS = 0.4
+LOUDNESS_HOP_SECONDS = 0.1
+LOUDNESS_ABSOLUTE_GATE = -70.0
+LOUDNESS_RELATIVE_GATE = -10.0
+# Per-speaker gains are clamped to this many dB and lowered further to keep peaks below full scale
+MAX_NORMALIZE_GAIN_DB = 20.0
+# Edge-TTS streams MPEG-2 Layer III at 24 kHz, 48 kbit/s, mono. A frame with zeroed side info
+# decodes to 576 samples of silence, so pauses can be spliced in without an encoder.
+EDGE_MP3_SAMPLE_RATE = 24000
+EDGE_MP3_FRAME_SAMPLES = 576
+EDGE_MP3_SILENT_FRAME = bytes([0xFF, 0xF3, 0x64, 0xC4]) + bytes(140)
+# On-disk synthesis cache shared by all jobs (LRU-evicted above the size cap)
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "tts_dialogue")
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Edge-TTS prosody defaults; part of the cache key so changed settings never reuse stale audio
+DEFAULT_PROSODY = {"rate": "+0%", "volume": "+0%", "pitch": "+0Hz"}
 
 # Available Voices (Keeping Chinese descriptions for internal structure)
 available_voices = {
@@ -68,56 +154,935 @@ available_voices = {
     },
 }
 
+# Default voice for each speaker ID (display names from available_voices)
+DEFAULT_SPEAKER_VOICES = {
+    'A': "Ryan (UK, Default)",
+    'B': "Jenny (US, Default)",
+    'C': "Christopher (US)",
+    'D': "Ana (US)",
+    'E': "Libby (UK)",
+    'F': "Guy (US, Default)",
+}
+FALLBACK_VOICE_ID = "en-US-JennyNeural"
+# The GUI applies queued progress events at most this often (milliseconds)
+PROGRESS_REFRESH_MS = 100
+PAUSE_PATTERN = re.compile(r"\[pause_(\d+(\.\d+)?)\]")
+# Text segments longer than this are split at sentence/clause boundaries and synthesized concurrently
+DEFAULT_MAX_CHUNK_CHARS = 400
+# Silence inserted between the chunks of a split segment, in seconds
+DEFAULT_CHUNK_GAP = 0.0
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?…])\s+|(?<=[.!?…][\"'”’)\]])\s+|(?<=[。！？])\s*")
+# Latin clause punctuation only counts when followed by whitespace, so "1,000" and "10:30" stay whole
+CLAUSE_BOUNDARY = re.compile(r"(?<=[,;:])\s+|(?<=[，；：—])\s*")
+WORD_BOUNDARY = re.compile(r"\s+")
+
+# --- Metrics ---
+
+class JobMetrics:
+    """Per-job timing spans by pipeline stage plus counters, exportable as JSON or Prometheus text.
+
+    Stages: synthesize (one request incl. queueing and retries), decode (incl. resample),
+    resample, silence, line_write, merge_stream (a line streamed into the merged file),
+    merge (the final merge), merge_read/merge_write (inside merge_wav_files) and job.
+    """
+
+    def __init__(self):
+        self.spans = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            self.spans.setdefault(stage, []).append(seconds)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @staticmethod
+    def _percentile(ordered, q):
+        return ordered[max(0, math.ceil(q * len(ordered)) - 1)]  # Nearest rank
+
+    def summary(self):
+        with self._lock:
+            spans = {stage: sorted(values) for stage, values in self.spans.items()}
+            counters = dict(self.counters)
+        stages = {stage: {"count": len(values), "total_s": round(sum(values), 6),
+                          "p50_s": round(self._percentile(values, 0.5), 6),
+                          "p95_s": round(self._percentile(values, 0.95), 6),
+                          "max_s": round(values[-1], 6)}
+                  for stage, values in spans.items()}
+        return {"stages": stages, "counters": counters}
+
+    def to_json(self):
+        return json.dumps(self.summary(), indent=2)
+
+    def to_prometheus(self, labels=None):
+        return prometheus_text([(labels or {}, self.summary())])
+
+def prometheus_text(entries):
+    """Renders (labels, JobMetrics.summary()) pairs in the Prometheus text exposition format.
+
+    Stage durations become summaries with 0.5/0.95 quantiles; counters become tts_<name>_total.
+    """
+    def label_text(labels):
+        escaped = {k: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for k, v in labels.items()}
+        return "{" + ",".join(f'{k}="{v}"' for k, v in escaped.items()) + "}" if escaped else ""
+
+    summaries = list(entries)
+    lines = ["# HELP tts_stage_seconds Time spent per pipeline stage.", "# TYPE tts_stage_seconds summary"]
+    for labels, summary in summaries:
+        for stage, stats in sorted(summary["stages"].items()):
+            stage_labels = dict(labels, stage=stage)
+            for quantile, key in (("0.5", "p50_s"), ("0.95", "p95_s")):
+                lines.append(f"tts_stage_seconds{label_text(dict(stage_labels, quantile=quantile))} {stats[key]}")
+            lines.append(f"tts_stage_seconds_sum{label_text(stage_labels)} {stats['total_s']}")
+            lines.append(f"tts_stage_seconds_count{label_text(stage_labels)} {stats['count']}")
+    for name in sorted({name for _, summary in summaries for name in summary["counters"]}):
+        lines.append(f"# TYPE tts_{name}_total counter")
+        for labels, summary in summaries:
+            if name in summary["counters"]:
+                lines.append(f"tts_{name}_total{label_text(labels)} {summary['counters'][name]}")
+    return "\n".join(lines) + "\n"
+
+def timed(metrics, stage):
+    """metrics.span(stage), or a no-op when no metrics are being collected."""
+    return metrics.span(stage) if metrics is not None else contextlib.nullcontext()
+
 # --- Audio Processing Functions (Minor updates for clarity) ---
 
-def merge_wav_files(file_list, output_filename):
+def merge_wav_files(file_list, output_filename, sample_rate=DEFAULT_SAMPLE_RATE, metrics=None,
+                    preallocate=True, workers=DEFAULT_MERGE_WORKERS):
+    """Merges the inputs into one WAV file with peak memory of about one block per worker.
+
+    When every input's exact length is known up front (WAV/FLAC/... already at sample_rate),
+    the output is preallocated with its final RIFF header and filled through memory maps of
+    disjoint regions, by `workers` threads. Otherwise the inputs are streamed into one open file.
+    """
     if not file_list: return False
     try:
+        frame_counts = _exact_frame_counts(file_list, sample_rate) if AUDIO_PROCESSING_AVAILABLE and preallocate else None
+        if frame_counts is not None:
+            _merge_preallocated(file_list, frame_counts, output_filename, sample_rate, metrics, workers)
+            return True
         if AUDIO_PROCESSING_AVAILABLE:
-            import librosa 
-            import soundfile as sf
-            combined_audio = np.array([], dtype=np.float32)
-            sample_rate = None
-            for f in file_list:
-                data, sr = librosa.load(f, sr=24000) 
-                if sample_rate is None: sample_rate = sr
-                combined_audio = np.concatenate([combined_audio, data])
-            sf.write(output_filename, combined_audio, sample_rate)
+            with sf.SoundFile(output_filename, 'w', samplerate=sample_rate, channels=1) as out_file:
+                for f in file_list:
+                    blocks = _iter_audio_blocks(f, sample_rate, metrics)
+                    while True:
+                        with timed(metrics, "merge_read"):
+                            block = next(blocks, None)
+                        if block is None: break
+                        with timed(metrics, "merge_write"):
+                            out_file.write(block)
             return True
         else:
             with wave.open(file_list[0], 'rb') as first_wav:
                 params = first_wav.getparams()
-                frames = first_wav.readframes(first_wav.getnframes())
             with wave.open(output_filename, 'wb') as out_wav:
                 out_wav.setparams(params)
-                out_wav.writeframes(frames)
-                for f in file_list[1:]:
+                for f in file_list:
                     try:
                         with wave.open(f, 'rb') as w:
-                            if w.getparams()[:4] == params[:4]: 
-                                out_wav.writeframes(w.readframes(w.getnframes()))
+                            # channels, sample width and rate; nframes differs between inputs
+                            if w.getparams()[:3] != params[:3]: continue
+                            while True:
+                                frames = w.readframes(MERGE_BLOCK_FRAMES)
+                                if not frames: break
+                                out_wav.writeframes(frames)
                     except: continue
             return True
     except Exception as e:
-        print(f"Error merging files: {e}")
+        print(f"Error merging files: {e}", file=sys.stderr)
+        if os.path.exists(output_filename):
+            try: os.unlink(output_filename)
+            except OSError: pass
         return False
 
-def create_silence_wav(seconds, sample_rate=24000):
-    if not AUDIO_PROCESSING_AVAILABLE:
-        return None 
-        
-    num_samples = int(sample_rate*seconds)
-    silence = np.zeros(num_samples, dtype=np.float32) 
-    
-    tmp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
+def _exact_frame_counts(file_list, sample_rate):
+    """Returns each input's frame count if all are known exactly and fit in one WAV file, else None."""
+    counts = []
+    for f in file_list:
+        try:
+            info = sf.info(f)
+        except RuntimeError:
+            return None
+        # MP3 lengths are estimates and other rates need resampling, so neither is known exactly
+        if info.samplerate != sample_rate or info.format == "MP3" or info.frames < 0:
+            return None
+        # The regions are filled by reading int16, which libsndfile only scales from integer PCM;
+        # float samples would come out as silence
+        if info.subtype not in INTEGER_PCM_SUBTYPES:
+            return None
+        counts.append(info.frames)
+    if WAV_HEADER_BYTES + 2 * sum(counts) > 0xFFFFFFFF:
+        return None  # Beyond the 4 GiB RIFF limit
+    return counts
+
+def wav_header(frames, sample_rate=DEFAULT_SAMPLE_RATE, channels=1, sample_width=2):
+    """Builds the 44-byte header of a PCM WAV file holding `frames` frames."""
+    data_bytes = frames * channels * sample_width
+    return (b"RIFF" + struct.pack("<I", 36 + data_bytes) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate,
+                                    sample_rate * channels * sample_width, channels * sample_width, 8 * sample_width)
+            + b"data" + struct.pack("<I", data_bytes))
+
+def _merge_preallocated(file_list, frame_counts, output_filename, sample_rate, metrics=None, workers=1):
+    """Writes a 16-bit mono WAV of the exact final size, then fills each input's region through its own mmap."""
+    total = sum(frame_counts)
+    with open(output_filename, "wb") as f:
+        f.write(wav_header(total, sample_rate))
+        f.truncate(WAV_HEADER_BYTES + 2 * total)
+
+    def fill(path, start, frames):
+        if frames == 0: return
+        # Mapping only this input's region keeps resident memory bounded by one input per worker
+        region = np.memmap(output_filename, dtype="<i2", mode="r+", offset=WAV_HEADER_BYTES + 2 * start, shape=(frames,))
+        try:
+            position = 0
+            blocks = sf.blocks(path, blocksize=MERGE_BLOCK_FRAMES, dtype="int16", always_2d=True)
+            while position < frames:
+                with timed(metrics, "merge_read"):
+                    block = next(blocks, None)
+                if block is None: break
+                mono = block[:, 0] if block.shape[1] == 1 else block.mean(axis=1).astype(np.int16)
+                count = min(len(mono), frames - position)
+                with timed(metrics, "merge_write"):
+                    region[position:position + count] = mono[:count]
+                position += count
+            region.flush()
+        finally:
+            del region
+
+    starts = [0] + list(itertools.accumulate(frame_counts))[:-1]
+    if workers > 1 and len(file_list) > 1:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(fill, *job) for job in zip(file_list, starts, frame_counts)]:
+                future.result()
+    else:
+        for job in zip(file_list, starts, frame_counts):
+            fill(*job)
+
+def _iter_audio_blocks(source, sample_rate, metrics=None):
+    """Yields mono float32 blocks of a file path or audio bytes at sample_rate."""
+    def open_source():
+        return io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
     try:
-        import soundfile as sf
-        sf.write(tmp_file.name, silence, sample_rate)
-        return tmp_file.name
-    except Exception as e:
-        print(f"Error creating silence file: {e}")
-        os.unlink(tmp_file.name)
+        info = sf.info(open_source())
+    except RuntimeError:
+        info = None  # Format libsndfile cannot open (MP3 before libsndfile 1.1); decoded via audioread below
+    if info is not None and info.samplerate == sample_rate:
+        # Fast path: already at the target rate, streamed without resampling
+        for block in sf.blocks(open_source(), blocksize=MERGE_BLOCK_FRAMES, dtype='float32', always_2d=True):
+            yield block.mean(axis=1) if block.shape[1] > 1 else block[:, 0]
+        return
+    if info is not None:
+        data, source_rate = sf.read(open_source(), dtype='float32', always_2d=True)
+        data = data.mean(axis=1) if data.shape[1] > 1 else data[:, 0]
+    elif isinstance(source, (bytes, bytearray)):
+        data, source_rate = _load_bytes_via_file(source)
+    else:
+        data, source_rate = librosa.load(source, sr=None)
+    with timed(metrics, "resample"):
+        data = resample_audio(data, source_rate, sample_rate)
+    for start in range(0, len(data), MERGE_BLOCK_FRAMES):
+        yield data[start:start + MERGE_BLOCK_FRAMES]
+
+def _load_bytes_via_file(data):
+    """Decodes audio bytes that libsndfile rejected through a temporary file.
+
+    librosa only falls back to audioread (ffmpeg, GStreamer, ...) for file paths; with a
+    file-like object it re-raises the soundfile error. Such bytes are Edge-TTS MP3 data.
+    """
+    fd, path = tempfile.mkstemp(suffix=".mp3", prefix="tts_decode_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return librosa.load(path, sr=None)
+    finally:
+        try: os.unlink(path)
+        except OSError: pass
+
+# Resampling ratios up to this (after reducing by the gcd) use the polyphase path; 44.1k<->48k is 160/147
+MAX_POLYPHASE_FACTOR = 640
+
+@functools.lru_cache(maxsize=16)
+def _polyphase_kernel(up, down):
+    """Low-pass FIR for resampling by up/down, designed once per ratio (scipy's default Kaiser design)."""
+    max_rate = max(up, down)
+    kernel = scipy_signal.firwin(2 * 10 * max_rate + 1, 1.0 / max_rate, window=("kaiser", 5.0)).astype(np.float32)
+    kernel.setflags(write=False)
+    return kernel
+
+def resample_audio(data, orig_sr, target_sr):
+    """Resamples a mono float32 buffer; a no-op when the rates already match.
+
+    Uses libsoxr directly when installed (skipping librosa's per-call overhead). Otherwise
+    rational ratios between the usual rates (8/16/22.05/24/44.1/48 kHz) run through scipy's
+    vectorized polyphase filter with the kernel cached per ratio; anything else goes to librosa.
+    """
+    if orig_sr == target_sr or not len(data):
+        return data
+    if SOXR_AVAILABLE:
+        return soxr.resample(np.asarray(data, dtype=np.float32), orig_sr, target_sr, quality="HQ")
+    divisor = math.gcd(int(orig_sr), int(target_sr))
+    up, down = int(target_sr) // divisor, int(orig_sr) // divisor
+    if max(up, down) > MAX_POLYPHASE_FACTOR:
+        return librosa.resample(data, orig_sr=orig_sr, target_sr=target_sr)
+    resampled = scipy_signal.resample_poly(np.asarray(data, dtype=np.float32), up, down, window=_polyphase_kernel(up, down))
+    return resampled.astype(np.float32, copy=False)
+
+def decode_audio(source, sample_rate=DEFAULT_SAMPLE_RATE, metrics=None):
+    """Decodes a file path or in-memory audio bytes once into a mono float32 buffer at sample_rate."""
+    with timed(metrics, "decode"):
+        return np.concatenate(list(_iter_audio_blocks(source, sample_rate, metrics)) or [np.zeros(0, dtype=np.float32)])
+
+@functools.lru_cache(maxsize=8)
+def k_weighting_sos(sample_rate):
+    """Second-order sections of the BS.1770 K-weighting filter (high shelf + high pass) at sample_rate."""
+    sections = []
+    # Stage 1: +4 dB high shelf at 1.5 kHz
+    A, w0 = 10 ** (4.0 / 40), 2 * math.pi * 1500.0 / sample_rate
+    alpha, cos_w0 = math.sin(w0) / (2 * (1 / math.sqrt(2))), math.cos(w0)
+    sections.append([A * ((A + 1) + (A - 1) * cos_w0 + 2 * math.sqrt(A) * alpha),
+                     -2 * A * ((A - 1) + (A + 1) * cos_w0),
+                     A * ((A + 1) + (A - 1) * cos_w0 - 2 * math.sqrt(A) * alpha),
+                     (A + 1) - (A - 1) * cos_w0 + 2 * math.sqrt(A) * alpha,
+                     2 * ((A - 1) - (A + 1) * cos_w0),
+                     (A + 1) - (A - 1) * cos_w0 - 2 * math.sqrt(A) * alpha])
+    # Stage 2: high pass at 38 Hz
+    w0 = 2 * math.pi * 38.0 / sample_rate
+    alpha, cos_w0 = math.sin(w0) / (2 * 0.5), math.cos(w0)
+    sections.append([(1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2, 1 + alpha, -2 * cos_w0, 1 - alpha])
+    # Left writable: sosfilt's Cython signature rejects read-only arrays
+    return np.array([[c / section[3] for c in section] for section in sections])
+
+def loudness_blocks(pcm, sample_rate=DEFAULT_SAMPLE_RATE):
+    """Returns the K-weighted mean square of every gating block of a line, for integrated_loudness.
+
+    Blocks are computed with one filter pass and a cumulative sum; a line shorter than one
+    block counts as a single block.
+    """
+    if not len(pcm):
+        return np.zeros(0)
+    weighted = np.square(scipy_signal.sosfilt(k_weighting_sos(sample_rate), pcm))
+    window, hop = int(sample_rate * LOUDNESS_BLOCK_SECONDS), int(sample_rate * LOUDNESS_HOP_SECONDS)
+    if len(weighted) < window:
+        return np.array([weighted.mean()])
+    cumulative = np.concatenate(([0.0], np.cumsum(weighted)))
+    starts = np.arange(0, len(weighted) - window + 1, hop)
+    return (cumulative[starts + window] - cumulative[starts]) / window
+
+def integrated_loudness(blocks):
+    """Gated loudness in LUFS of the given block mean squares (e.g. all lines of one speaker); None if silent."""
+    blocks = np.asarray(blocks)
+    with np.errstate(divide="ignore"):
+        levels = -0.691 + 10 * np.log10(blocks)
+    gated = blocks[levels > LOUDNESS_ABSOLUTE_GATE]
+    if not len(gated):
         return None
+    relative_gate = -0.691 + 10 * math.log10(gated.mean()) + LOUDNESS_RELATIVE_GATE
+    gated = blocks[levels > max(relative_gate, LOUDNESS_ABSOLUTE_GATE)]
+    return -0.691 + 10 * math.log10(gated.mean())
+
+@functools.lru_cache(maxsize=None)
+def audio_executor():
+    """Returns the pool shared by all jobs for CPU-bound audio work, created on first use."""
+    return concurrent.futures.ThreadPoolExecutor(max_workers=DEFAULT_AUDIO_WORKERS, thread_name_prefix="tts-audio")
+
+class LoudnessMeter:
+    """Collects loudness blocks and peaks per speaker as lines are decoded, then derives gains.
+
+    This is the measuring pass of the two-pass normalization; the gains are applied while the
+    merged file is written. add() may be called from several worker threads at once.
+    """
+
+    def __init__(self, sample_rate=DEFAULT_SAMPLE_RATE, target_lufs=DEFAULT_TARGET_LUFS):
+        self.sample_rate = sample_rate
+        self.target_lufs = target_lufs
+        self._blocks = {}
+        self._peaks = {}
+        self._lock = threading.Lock()
+
+    def add(self, speaker, pcm):
+        if pcm is None or not len(pcm): return
+        blocks, peak = loudness_blocks(pcm, self.sample_rate), float(np.abs(pcm).max())
+        with self._lock:
+            self._blocks.setdefault(speaker, []).append(blocks)
+            self._peaks[speaker] = max(self._peaks.get(speaker, 0.0), peak)
+
+    def loudness(self):
+        """Maps each speaker to its integrated loudness over all of its lines."""
+        return {speaker: integrated_loudness(np.concatenate(blocks)) for speaker, blocks in self._blocks.items()}
+
+    def gains(self):
+        """Maps each speaker to the linear gain that brings it to target_lufs without clipping."""
+        gains = {}
+        for speaker, lufs in self.loudness().items():
+            gain_db = 0.0 if lufs is None else \
+                max(-MAX_NORMALIZE_GAIN_DB, min(MAX_NORMALIZE_GAIN_DB, self.target_lufs - lufs))
+            peak = self._peaks.get(speaker, 0.0)
+            if peak > 0: gain_db = min(gain_db, -20 * math.log10(peak))
+            gains[speaker] = 10 ** (gain_db / 20)
+        return gains
+
+class OrderedPcmWriter:
+    """Writes line buffers to one open output file in script order as they arrive.
+
+    Lines that arrive ahead of their turn wait in memory up to max_buffered_seconds in total;
+    beyond that they are spilled as raw float32 to a temporary file, so one slow line cannot
+    pile the rest of the script up in RAM. An optional LinePostProcessor shapes the joins
+    between consecutive lines on the way out.
+
+    With hold=True every line is spilled and nothing is written until release(gains), which
+    streams the lines out in order with a gain per speaker (for loudness normalization).
+    """
+
+    def __init__(self, filename, sample_rate=DEFAULT_SAMPLE_RATE, post_processor=None,
+                 max_buffered_seconds=WRITER_BUFFER_SECONDS, hold=False):
+        self.filename = filename
+        self.frames = 0
+        self.post_processor = post_processor
+        self.hold = hold
+        self.gains = None
+        self._file = sf.SoundFile(filename, 'w', samplerate=sample_rate, channels=1)
+        self._pending = {}
+        self._next_index = 0
+        self._max_buffered = int(sample_rate * max_buffered_seconds)
+        self._buffered = 0
+        self._spill = None
+
+    def add(self, index, pcm, speaker=None):
+        """Queues the buffer for line `index` (None for a skipped line) and flushes every ready line."""
+        stored = None  # Written straight away
+        if pcm is not None and (self.hold or index != self._next_index):
+            if self.hold or self._buffered + len(pcm) > self._max_buffered:
+                pcm, stored = self._spill_pcm(pcm), "spilled"
+            else:
+                self._buffered += len(pcm)
+                stored = "buffered"
+        self._pending[index] = (pcm, speaker, stored)
+        if not self.hold:
+            self._flush()
+
+    def release(self, gains=None):
+        """Ends hold mode and writes every held line in order, scaled by gains[speaker]."""
+        self.hold = False
+        self.gains = gains
+        self._flush()
+
+    def _flush(self):
+        while self._next_index in self._pending:
+            data, speaker, stored = self._pending.pop(self._next_index)
+            if stored == "spilled":
+                data = self._read_spilled(*data)
+            elif stored == "buffered":
+                self._buffered -= len(data)
+            if data is not None and len(data):
+                if self.gains:
+                    data = data * np.float32(self.gains.get(speaker, 1.0))
+                self._write(self.post_processor.process(data, speaker) if self.post_processor else [data])
+            self._next_index += 1
+
+    def _spill_pcm(self, pcm):
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile(prefix="tts_spill_", dir=os.path.dirname(os.path.abspath(self.filename)))
+        self._spill.seek(0, os.SEEK_END)
+        offset = self._spill.tell()
+        self._spill.write(memoryview(np.ascontiguousarray(pcm, dtype=np.float32)).cast("B"))
+        return offset, len(pcm)
+
+    def _read_spilled(self, offset, frames):
+        self._spill.seek(offset)
+        return np.frombuffer(self._spill.read(frames * 4), dtype=np.float32)
+
+    def _write(self, blocks):
+        for block in blocks:
+            if len(block):
+                self._file.write(block)
+                self.frames += len(block)
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()  # A temporary file: closing deletes it
+            self._spill = None
+        if self._file.closed: return
+        if self.post_processor: self._write(self.post_processor.finish())
+        self._file.close()
+
+    def discard(self):
+        self.post_processor = None
+        self.close()
+        if os.path.exists(self.filename):
+            try: os.unlink(self.filename)
+            except OSError: pass
+
+@functools.lru_cache(maxsize=8)
+def equal_power_fades(length):
+    """Returns shared read-only (fade_in, fade_out) curves whose squares sum to one."""
+    phase = (np.arange(length, dtype=np.float32) + 0.5) / length * (np.pi / 2)
+    fade_in, fade_out = np.sin(phase).astype(np.float32), np.cos(phase).astype(np.float32)
+    fade_in.flags.writeable = fade_out.flags.writeable = False
+    return fade_in, fade_out
+
+class LinePostProcessor:
+    """Trims, spaces and crossfades consecutive lines for the merged file.
+
+    Each line is handled in one vectorized pass over its buffer: frame energy (RMS over 10 ms
+    frames) locates the first and last sound above threshold_db, keeping trim_margin seconds
+    around it. Lines are then joined with line_gap seconds of silence, or speaker_gap when the
+    speaker changes. Every join gets crossfade-second equal-power fades; with a zero gap the
+    lines overlap by that length instead. One line is held back so its end can be faded or
+    overlapped with the next.
+    """
+
+    def __init__(self, sample_rate=DEFAULT_SAMPLE_RATE, trim=True, threshold_db=-45.0, trim_margin=0.02,
+                 line_gap=0.25, speaker_gap=0.5, crossfade=0.01):
+        self.sample_rate = sample_rate
+        self.trim = trim
+        self.threshold = 10 ** (threshold_db / 20)
+        self.trim_margin = trim_margin
+        self.line_gap = line_gap
+        self.speaker_gap = speaker_gap
+        self.crossfade = crossfade
+        self._held = None
+        self._held_speaker = None
+
+    def trim_silence(self, pcm):
+        """Returns the view of pcm between its first and last frame above the energy threshold."""
+        frame = max(1, int(self.sample_rate * 0.01))
+        frame_count = len(pcm) // frame
+        if frame_count == 0:
+            return pcm
+        energy = np.sqrt(np.mean(np.square(pcm[:frame_count * frame].reshape(frame_count, frame)), axis=1))
+        loud = np.flatnonzero(energy > self.threshold)
+        if not len(loud):
+            return pcm[:0]
+        margin = int(self.sample_rate * self.trim_margin)
+        return pcm[max(0, loud[0] * frame - margin):min(len(pcm), (loud[-1] + 1) * frame + margin)]
+
+    def process(self, pcm, speaker=None):
+        """Takes the next line in order; returns the buffers that are now final, for writing."""
+        if self.trim:
+            pcm = self.trim_silence(pcm)
+        if not len(pcm):
+            return []
+        pcm = np.array(pcm, dtype=np.float32)  # The one copy: fades are applied in place
+        fade = min(int(self.sample_rate * self.crossfade), len(pcm) // 2)
+        fade_in, fade_out = equal_power_fades(fade) if fade else (None, None)
+        held, self._held, self._held_speaker, previous_speaker = self._held, pcm, speaker, self._held_speaker
+        if held is None:
+            if fade: pcm[:fade] *= fade_in
+            return []
+
+        gap = self.speaker_gap if speaker != previous_speaker else self.line_gap
+        overlap = min(fade, len(held) // 2)
+        if gap > 0 or not overlap:
+            # Fade the previous line out and this one in around a stretch of silence
+            if overlap: held[-overlap:] *= equal_power_fades(overlap)[1]
+            if fade: pcm[:fade] *= fade_in
+            return [held, silence_samples(gap, self.sample_rate)] if gap > 0 else [held]
+        # No gap: overlap the joint with an equal-power crossfade
+        fade_in, fade_out = equal_power_fades(overlap)
+        pcm[:overlap] = held[-overlap:] * fade_out + pcm[:overlap] * fade_in
+        return [held[:-overlap]]
+
+    def finish(self):
+        """Returns the held last line, faded out."""
+        held, self._held = self._held, None
+        if held is None:
+            return []
+        fade = min(int(self.sample_rate * self.crossfade), len(held) // 2)
+        if fade: held[-fade:] *= equal_power_fades(fade)[1]
+        return [held]
+
+class PreviewPlayer:
+    """Plays line buffers in script order as they arrive, straight from memory.
+
+    add() may be called from any thread, with None for a line that failed. A background
+    thread plays each line as soon as every earlier line has played, so the first sound
+    comes as soon as line 1 is synthesized. Playback ends after `total` lines, on stop(),
+    when stop_event is set, or when done_event is set and the next line never arrived.
+    """
+
+    def __init__(self, total, sample_rate=DEFAULT_SAMPLE_RATE, stop_event=None, done_event=None):
+        self.total = total
+        self.sample_rate = sample_rate
+        self.stop_event = stop_event
+        self.done_event = done_event
+        self._pending = {}
+        self._stopped = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._play_all, name="tts-preview", daemon=True)
+        self._thread.start()
+
+    def add(self, index, pcm):
+        with self._cond:
+            self._pending[index] = pcm
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    def _halted(self):
+        return self._stopped or (self.stop_event is not None and self.stop_event.is_set())
+
+    def _next_line(self, index):
+        """Waits for line `index`; returns its buffer, or False once playback should end."""
+        with self._cond:
+            while index not in self._pending:
+                if self._halted() or (self.done_event is not None and self.done_event.is_set()):
+                    return False
+                self._cond.wait(0.1)
+            return self._pending.pop(index)
+
+    def _play_all(self):
+        try:
+            pygame.mixer.init(frequency=self.sample_rate, size=-16, channels=1)
+            frequency, _, channels = pygame.mixer.get_init()
+        except Exception as e:
+            print(f"Preview playback unavailable: {e}", file=sys.stderr)
+            return
+        try:
+            for index in range(self.total):
+                pcm = self._next_line(index)
+                if pcm is False: return
+                if pcm is None or not len(pcm): continue
+                if frequency != self.sample_rate:
+                    pcm = resample_audio(pcm, self.sample_rate, frequency)
+                samples = (np.clip(pcm, -1.0, 1.0) * 32767).astype(np.int16)
+                if channels > 1:
+                    samples = np.repeat(samples[:, None], channels, axis=1)
+                channel = pygame.mixer.Sound(buffer=samples.tobytes()).play()
+                while channel is not None and channel.get_busy():
+                    if self._halted():
+                        channel.stop()
+                        return
+                    time.sleep(0.02)
+        finally:
+            pygame.mixer.quit()
+
+@functools.lru_cache(maxsize=64)
+def silence_samples(seconds, sample_rate=DEFAULT_SAMPLE_RATE):
+    """Returns a shared read-only buffer of silence, spliced directly into a line's PCM."""
+    silence = np.zeros(int(sample_rate*seconds), dtype=np.float32)
+    silence.flags.writeable = False
+    return silence
+
+@functools.lru_cache(maxsize=64)
+def silent_mp3_frames(seconds):
+    """Returns pre-encoded silent MP3 frames for splicing between Edge-TTS streams without a decoder."""
+    frame_count = max(1, round(seconds * EDGE_MP3_SAMPLE_RATE / EDGE_MP3_FRAME_SAMPLES)) if seconds > 0 else 0
+    return EDGE_MP3_SILENT_FRAME * frame_count
+
+# Layer III bitrates (kbps) by bitrate index, and sample rates by version bits (MPEG1, MPEG2, MPEG2.5)
+MP3_BITRATES = {3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+                2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)}
+MP3_BITRATES[0] = MP3_BITRATES[2]
+MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+def mp3_frame_length(data, offset=0):
+    """Returns the byte length of the Layer III frame whose header starts at `offset`, or None."""
+    header = data[offset:offset + 4]
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version, layer = (header[1] >> 3) & 3, (header[1] >> 1) & 3
+    bitrate_index, rate_index, padding = header[2] >> 4, (header[2] >> 2) & 3, (header[2] >> 1) & 1
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    bitrate = MP3_BITRATES[version][bitrate_index] * 1000
+    return (144 if version == 3 else 72) * bitrate // MP3_SAMPLE_RATES[version][rate_index] + padding
+
+def strip_mp3_headers(data):
+    """Returns only the audio frames of an MP3 stream: ID3v2/ID3v1 tags and a Xing/Info/VBRI frame are dropped.
+
+    Those headers describe one whole file, so they must not end up in the middle of a concatenation.
+    """
+    start, end = 0, len(data)
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        start = 10 + size + (10 if data[5] & 0x10 else 0)  # Header, tag body, optional footer
+    if end - start >= 128 and data[end - 128:end - 125] == b"TAG":
+        end -= 128
+    # Skip anything before the first frame
+    while start < end and mp3_frame_length(data, start) is None:
+        start += 1
+    frame_length = mp3_frame_length(data, start)
+    if frame_length and any(tag in data[start:start + frame_length] for tag in (b"Xing", b"Info", b"VBRI")):
+        start += frame_length
+    return data[start:end]
+
+def merge_mp3_files(file_list, output_filename):
+    """Concatenates the audio frames of MP3 files without decoding; returns True on success."""
+    if not file_list: return False
+    try:
+        with open(output_filename, "wb") as out_file:
+            for f in file_list:
+                with open(f, "rb") as in_file:
+                    out_file.write(strip_mp3_headers(in_file.read()))
+        return True
+    except OSError as e:
+        print(f"Error merging files: {e}", file=sys.stderr)
+        if os.path.exists(output_filename):
+            try: os.unlink(output_filename)
+            except OSError: pass
+        return False
+
+def resolve_voice_id(voice):
+    """Accepts either a display name from available_voices or a raw Edge-TTS voice id."""
+    for voices_in_category in available_voices.values():
+        if voice in voices_in_category:
+            return voices_in_category[voice]
+    return voice
+
+def split_pause_segments(text):
+    """Splits a line at [pause_X] tags into ("text", str) and ("pause", seconds) segments."""
+    segments = []
+    last_index = 0
+    for m in PAUSE_PATTERN.finditer(text):
+        start, end = m.span()
+        if start>last_index: segments.append(("text", text[last_index:start]))
+        segments.append(("pause", float(m.group(1))))
+        last_index = end
+    if last_index < len(text): segments.append(("text", text[last_index:]))
+    return segments
+
+def chunk_text(text, max_chars=DEFAULT_MAX_CHUNK_CHARS):
+    """Splits text into chunks of at most max_chars, preferring sentence, then clause, then word boundaries.
+
+    Chunks are slices of the original text, so the separators inside a chunk are kept as written.
+    """
+    text = text.strip()
+    if not max_chars or len(text) <= max_chars:
+        return [text] if text else []
+
+    def spans(start, end, level):
+        # Yields (start, end) spans of text[start:end] of at most max_chars, without outer whitespace
+        while start < end and text[start].isspace(): start += 1
+        while end > start and text[end - 1].isspace(): end -= 1
+        if start == end:
+            return
+        if end - start <= max_chars or level == 3:
+            # Level 3 is one unbroken run of characters: cut it every max_chars
+            for k in range(start, end, max_chars):
+                yield k, min(k + max_chars, end)
+            return
+        previous = start
+        for match in (SENTENCE_BOUNDARY, CLAUSE_BOUNDARY, WORD_BOUNDARY)[level].finditer(text, start, end):
+            yield from spans(previous, match.start(), level + 1)
+            previous = match.end()
+        yield from spans(previous, end, level + 1)
+
+    # Greedily pack neighbouring spans back together up to max_chars
+    chunks = []
+    for start, end in spans(0, len(text), 0):
+        if chunks and end - chunks[-1][0] <= max_chars:
+            chunks[-1] = (chunks[-1][0], end)
+        else:
+            chunks.append((start, end))
+    return [text[start:end] for start, end in chunks]
+
+def parse_dialogue(dialogue_text, speaker_voices):
+    """Parses 'Speaker: Text' lines into (speaker, text, voice_id) tuples.
+
+    Returns the parsed list and the speaker IDs that had no voice assigned, one entry per skipped line.
+    """
+    parsed = []
+    skipped_speakers = []
+    for line in (L.strip() for L in dialogue_text.splitlines()):
+        if ":" not in line: continue
+        s, t = line.split(":", 1)
+        speaker_id = s.strip().upper()
+        if speaker_id in speaker_voices:
+            parsed.append((speaker_id, t.strip(), speaker_voices[speaker_id]))
+        else:
+            skipped_speakers.append(speaker_id)
+    return parsed, skipped_speakers
+
+async def stream_tts_audio(text, voice_id, prosody=None):
+    """Collects the audio chunks of one Edge-TTS request in memory."""
+    chunks = []
+    tts = edge_tts.Communicate(text, voice=voice_id, **(prosody or {}))
+    async for chunk in tts.stream():
+        if chunk["type"] == "audio":
+            chunks.append(chunk["data"])
+    if not chunks:
+        # Usually a throttled or dropped connection, so it is treated as transient and retried
+        raise ConnectionError(f"No audio received for '{text}'")
+    return b"".join(chunks)
+
+# --- TTS Backends ---
+
+class TTSBackend:
+    """Turns one text segment into encoded audio bytes.
+
+    audio_format names the container of the returned bytes ("mp3" or "wav"); it decides how
+    lines are stitched when librosa/soundfile are not installed.
+    """
+    name = "base"
+    audio_format = "mp3"
+    # Requests per second allowed by the service (None for no limit)
+    rate_limit = None
+    # Whether synthesize_ssml() accepts a whole line with <break> elements in one request
+    supports_ssml = False
+
+    async def synthesize(self, text, voice_id, prosody=None):
+        raise NotImplementedError
+
+    async def synthesize_ssml(self, ssml, voice_id):
+        raise NotImplementedError
+
+def build_ssml(segments, voice_id, prosody=None):
+    """Renders split_pause_segments() output as one SSML document with <break> elements for pauses."""
+    prosody = dict(DEFAULT_PROSODY, **(prosody or {}))
+    body = "".join(xml_escape(value.strip()) if seg_type == "text" else f'<break time="{round(value * 1000)}ms"/>'
+                   for seg_type, value in segments if seg_type == "pause" or value.strip())
+    return (f'<speak version="1.0" xmlns="http://www.w3.org/2001/10/synthesis" xml:lang="en-US">'
+            f'<voice name="{voice_id}"><prosody rate="{prosody["rate"]}" volume="{prosody["volume"]}" '
+            f'pitch="{prosody["pitch"]}">{body}</prosody></voice></speak>')
+
+class EdgeTTSBackend(TTSBackend):
+    """The Microsoft Edge online TTS service.
+
+    edge-tts escapes its input and wraps it in its own SSML, so <break> elements cannot be
+    sent; lines with pauses are synthesized segment by segment.
+    """
+    name = "edge"
+    audio_format = "mp3"
+    rate_limit = DEFAULT_REQUEST_RATE
+
+    async def synthesize(self, text, voice_id, prosody=None):
+        return await stream_tts_audio(text, voice_id, prosody)
+
+class StubTTSBackend(TTSBackend):
+    """Offline backend for load testing and benchmarks.
+
+    Returns a WAV tone whose pitch depends on the voice and whose length scales with the text,
+    so output is deterministic. Latency (fixed, per character, plus optional jitter) and a
+    transient error rate are simulated with a seeded RNG.
+    """
+    name = "stub"
+    audio_format = "wav"
+    supports_ssml = True
+
+    def __init__(self, latency=0.0, latency_jitter=0.0, error_rate=0.0, seconds_per_char=0.06,
+                 sample_rate=DEFAULT_SAMPLE_RATE, seed=0, latency_per_char=0.0):
+        self.latency = latency
+        # Real services take longer for longer text
+        self.latency_per_char = latency_per_char
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.seconds_per_char = seconds_per_char
+        self.sample_rate = sample_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    async def _simulate_request(self, text):
+        self.calls += 1
+        delay = self.latency + self.latency_per_char * len(text) + self._rng.uniform(0, self.latency_jitter)
+        failed = self._rng.random() < self.error_rate
+        if delay > 0: await asyncio.sleep(delay)
+        if failed:
+            raise ConnectionError(f"Simulated stub backend failure for '{text}'")
+
+    async def synthesize(self, text, voice_id, prosody=None):
+        await self._simulate_request(text)
+        return self.render_tone(text, voice_id)
+
+    async def synthesize_ssml(self, ssml, voice_id):
+        await self._simulate_request(xml_unescape(re.sub(r"<[^>]+>", " ", ssml)).strip())
+        # Same audio as the segment-by-segment path: one tone per text run, silence per <break>
+        body = re.search(r"<prosody[^>]*>(.*)</prosody>", ssml, re.S).group(1)
+        parts = []
+        for text, millis in re.findall(r'([^<]+)|<break time="(\d+)ms"/>', body):
+            if text:
+                parts.append(self._tone_samples(xml_unescape(text), voice_id))
+            else:
+                parts.append(np.zeros(int(self.sample_rate * int(millis) / 1000), dtype=np.float32))
+        return self._wav_bytes(np.concatenate(parts))
+
+    def render_tone(self, text, voice_id):
+        return self._wav_bytes(self._tone_samples(text, voice_id))
+
+    def _tone_samples(self, text, voice_id):
+        frequency = 140.0 + zlib.crc32(voice_id.encode("utf-8")) % 260
+        num_samples = max(1, int(self.sample_rate * max(0.1, len(text) * self.seconds_per_char)))
+        t = np.arange(num_samples, dtype=np.float32) / self.sample_rate
+        tone = 0.3 * np.sin(2 * np.pi * frequency * t)
+        ramp = min(num_samples // 2, int(self.sample_rate * 0.01))
+        if ramp:
+            fade = np.linspace(0.0, 1.0, ramp, dtype=np.float32)
+            tone[:ramp] *= fade
+            tone[-ramp:] *= fade[::-1]
+        return tone
+
+    def _wav_bytes(self, samples):
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(self.sample_rate)
+            w.writeframes((samples * 32767).astype("<i2").tobytes())
+        return buffer.getvalue()
+
+TTS_BACKENDS = {"edge": EdgeTTSBackend, "stub": StubTTSBackend}
+
+def create_backend(name="edge", **options):
+    """Builds a backend by name; options go to its constructor (e.g. latency=0.2 for the stub)."""
+    try:
+        return TTS_BACKENDS[name](**options)
+    except KeyError:
+        raise ValueError(f"Unknown TTS backend '{name}' (available: {', '.join(TTS_BACKENDS)})") from None
+
+def write_encoded_line(output_filename, sources, audio_format):
+    """Stitches encoded segments without a decoder; float entries are pauses in seconds."""
+    if audio_format == "mp3":
+        # MP3 frames concatenate cleanly, and pauses become pre-encoded silent frames
+        with open(output_filename, "wb") as f:
+            for src in sources:
+                f.write(silent_mp3_frames(src) if isinstance(src, float) else strip_mp3_headers(src))
+        return
+    params = None
+    with wave.open(output_filename, "wb") as out_wav:
+        for src in sources:
+            if isinstance(src, float):
+                if params is None:
+                    params = (1, 2, DEFAULT_SAMPLE_RATE)
+                    out_wav.setparams(params + (0, "NONE", "not compressed"))
+                nchannels, sampwidth, framerate = params
+                out_wav.writeframes(bytes(int(src * framerate) * nchannels * sampwidth))
+                continue
+            with wave.open(io.BytesIO(src), "rb") as w:
+                src_params = (w.getnchannels(), w.getsampwidth(), w.getframerate())
+                if params is None:
+                    params = src_params
+                    out_wav.setparams(params + (0, "NONE", "not compressed"))
+                if src_params == params:
+                    out_wav.writeframes(w.readframes(w.getnframes()))
+
+def resolve_output_format(audio_format, output_format="wav"):
+    """Returns (file extension, passthrough) for a backend's audio format and the requested output format.
+
+    MP3 output from an MP3 backend (or any MP3 backend without a decoder) keeps the encoded
+    frames end to end; everything else is decoded, and written as MP3 only if asked for.
+    """
+    passthrough = audio_format == "mp3" and (output_format == "mp3" or not AUDIO_PROCESSING_AVAILABLE)
+    if passthrough or (output_format == "mp3" and AUDIO_PROCESSING_AVAILABLE):
+        return ".mp3", passthrough
+    return ".wav", passthrough
 
 def get_voice_display_name(voice_id):
     for category, voices_in_category in available_voices.items():
@@ -127,124 +1092,574 @@ def get_voice_display_name(voice_id):
                 return name.split(" (")[0]
     return voice_id
 
+# --- Synthesis Cache ---
+
+class SynthesisCache:
+    """Content-addressed store of synthesized segments, evicted least-recently-used first."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(text, voice_id, prosody=None, backend_name="edge"):
+        normalized = " ".join(unicodedata.normalize("NFC", text).split())
+        payload = json.dumps([backend_name, normalized, voice_id, sorted((prosody or {}).items())], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.audio")
+
+    def get(self, key):
+        """Returns the cached audio bytes for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # mtime doubles as the LRU timestamp
+        except OSError:
+            with self._lock: self.misses += 1
+            return None
+        with self._lock: self.hits += 1
+        return data
+
+    def put(self, key, data):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.urandom(4).hex()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Cache write failed: {e}", file=sys.stderr)
+            if os.path.exists(tmp_path): os.unlink(tmp_path)
+            return
+        with self._lock:
+            if self._size is not None:
+                self._size += len(data)
+            if self._size is None or self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".audio"):
+                try:
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                except OSError: continue
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if self._size <= self.max_bytes: break
+            try:
+                os.unlink(path)
+                self._size -= size
+            except OSError: pass
+
+# --- Job Manifest ---
+
+class JobManifest:
+    """Append-only per-line checkpoint log kept in a job's output directory.
+
+    The first record holds the job settings; every completed line appends one record with
+    its speaker, voice, text hash, output file, size and duration. When a job is started with
+    `lines`, the previous run's records are diffed against the new script so unchanged lines
+    are reused even after insertions or deletions shifted their index; only new or edited
+    lines need synthesizing.
+    """
+    FILENAME = "tts_manifest.jsonl"
+
+    def __init__(self, output_dir, settings, lines=None, line_files=None):
+        self.path = os.path.join(output_dir, self.FILENAME)
+        self.settings = settings
+        self.lines = {}
+        self.reused = {}
+        previous = self._load() if lines is not None else []
+        if previous:
+            self._reuse(previous, lines, line_files)
+        # The manifest is rewritten to describe only the current layout, then appended to per line
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._append(dict(type="job", **settings))
+        for index in sorted(self.lines):
+            self._append(self.lines[index])
+
+    @staticmethod
+    def text_hash(text):
+        return hashlib.sha256(" ".join(unicodedata.normalize("NFC", text).split()).encode("utf-8")).hexdigest()
+
+    @classmethod
+    def line_key(cls, speaker, text, voice_id):
+        return speaker, voice_id, cls.text_hash(text)
+
+    def _load(self):
+        """Returns the previous run's line records in script order."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                records = [json.loads(L) for L in f if L.strip()]
+        except (OSError, ValueError):
+            return []
+        if not records or records[0].get("type") != "job" or \
+                {k: records[0].get(k) for k in self.settings} != self.settings:
+            return []  # Different output settings: nothing can be reused
+        latest = {r["index"]: r for r in records[1:] if r.get("type") == "line"}
+        return [latest[index] for index in sorted(latest)]
+
+    def _intact(self, record):
+        path = os.path.join(os.path.dirname(self.path), record["file"])
+        try:
+            if os.path.getsize(path) != record["size"]:
+                return False
+            if AUDIO_PROCESSING_AVAILABLE and record.get("duration") is not None and \
+                    abs(sf.info(path).duration - record["duration"]) > 0.001:
+                return False
+        except (OSError, RuntimeError):
+            return False
+        return True
+
+    def _reuse(self, previous, lines, line_files):
+        """Matches previous records to `lines` and moves the reusable files to their new names."""
+        output_dir = os.path.dirname(self.path)
+        old_keys = [(r["speaker"], r["voice"], r["text_hash"]) for r in previous]
+        new_keys = [self.line_key(*line) for line in lines]
+        matcher = difflib.SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+        matches = [(previous[a + k], b + k) for a, b, size in matcher.get_matching_blocks() for k in range(size)]
+        matches = [(record, i) for record, i in matches if self._intact(record)]
+
+        # Two-phase rename so a shifted file never overwrites another one that is still to be moved
+        staged = []
+        for record, i in matches:
+            temp = os.path.join(output_dir, f".{record['file']}.reuse")
+            try:
+                os.replace(os.path.join(output_dir, record["file"]), temp)
+                staged.append((record, i, temp))
+            except OSError as e:
+                print(f"Cannot reuse {record['file']}: {e}", file=sys.stderr)
+        for record, i, temp in staged:
+            try:
+                os.replace(temp, line_files[i])
+            except OSError as e:
+                print(f"Cannot reuse {record['file']}: {e}", file=sys.stderr)
+                continue
+            self.reused[i + 1] = line_files[i]
+            self.lines[i + 1] = dict(record, index=i + 1, file=os.path.basename(line_files[i]))
+
+        # Files of edited or deleted lines would otherwise linger with stale audio
+        kept = {os.path.basename(f) for f in self.reused.values()}
+        for record in previous:
+            if record["file"] not in kept:
+                try:
+                    os.unlink(os.path.join(output_dir, record["file"]))
+                except OSError:
+                    pass
+
+    def _append(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def record(self, index, speaker, text, voice_id, line_file, duration=None):
+        record = {"type": "line", "index": index, "speaker": speaker, "voice": voice_id,
+                  "text_hash": self.text_hash(text), "file": os.path.basename(line_file),
+                  "size": os.path.getsize(line_file),
+                  "duration": round(duration, 4) if duration is not None else None}
+        self.lines[index] = record
+        self._append(record)
+
+    def close(self):
+        if not self._file.closed: self._file.close()
+
+# --- Progress Events ---
+
+class ProgressEvent:
+    """One typed progress update of a job; `message` is the human-readable status line."""
+    STARTED = "started"
+    LINE_STARTED = "line_started"
+    LINE_DONE = "line_done"
+    LINE_FAILED = "line_failed"
+    INFO = "info"
+    MERGING = "merging"
+    DONE = "done"
+    CANCELLED = "cancelled"
+    FAILED = "failed"
+    # A job emits exactly one of these last
+    TERMINAL = (DONE, CANCELLED, FAILED)
+    # Only the newest of these matters to a display; the rest may be dropped
+    COALESCIBLE = (LINE_STARTED, LINE_DONE, INFO, MERGING)
+
+    def __init__(self, kind, message, completed=0, total=0, elapsed=0.0, index=None, reused=False,
+                 file=None, stats=None, job_id=None):
+        self.kind = kind
+        self.message = message
+        self.completed = completed
+        self.total = total
+        self.elapsed = elapsed
+        self.index = index  # 1-based line number for line events
+        self.reused = reused
+        self.file = file
+        self.stats = stats or {}
+        self.job_id = job_id
+
+    @property
+    def terminal(self):
+        return self.kind in self.TERMINAL
+
+    def __repr__(self):
+        return f"ProgressEvent({self.kind!r}, job={self.job_id}, {self.completed}/{self.total}, {self.message!r})"
+
+class ProgressChannel:
+    """Thread-safe event buffer that a UI drains at its own refresh rate.
+
+    Jobs put() events from any thread. drain() returns what arrived since the last call, with
+    every line-failure and terminal event kept in order but only the newest coalescible event
+    per job, so a busy job costs one UI update per refresh instead of one per line.
+    """
+
+    def __init__(self):
+        self._events = []
+        self._lock = threading.Lock()
+
+    def put(self, event):
+        with self._lock:
+            self._events.append(event)
+
+    def drain(self):
+        with self._lock:
+            events, self._events = self._events, []
+        latest = {}
+        for position, event in enumerate(events):
+            if event.kind in ProgressEvent.COALESCIBLE:
+                latest[event.job_id] = position
+        return [event for position, event in enumerate(events)
+                if event.kind not in ProgressEvent.COALESCIBLE or latest[event.job_id] == position]
+
 async def generate_individual_audios(dialogue_list, status_callback=None, output_dir=".", 
                                      filename_format="{index}_{speaker}.wav", root_instance=None, 
                                      merge_files=False, merged_filename="merged_output.wav", 
-                                     voice_id_map=None, stop_event=None, delete_singles=True): # ADDED delete_singles
+                                     voice_id_map=None, stop_event=None, delete_singles=True,
+                                     max_concurrency=DEFAULT_MAX_CONCURRENCY, prosody=None,
+                                     use_cache=True, cache_dir=DEFAULT_CACHE_DIR,
+                                     cache_max_bytes=DEFAULT_CACHE_MAX_BYTES, scheduler=None, backend=None,
+                                     resume=False, coalesce_pauses=True,
+                                     max_chunk_chars=DEFAULT_MAX_CHUNK_CHARS, chunk_gap=DEFAULT_CHUNK_GAP,
+                                     on_line_ready=None, output_format="wav", metrics=None,
+                                     event_callback=None, sample_rate=DEFAULT_SAMPLE_RATE, post_process=None,
+                                     normalize_loudness=None):
     
-    global is_generating
-    is_generating = True
     generated_files = []
     total = len(dialogue_list)
-    pause_pattern = re.compile(r"\[pause_(\d+(\.\d+)?)\]")
+    # Stage timings and counters; written to tts_metrics.json in the output directory at the end
+    metrics = metrics if metrics is not None else JobMetrics()
+    job_started = time.perf_counter()
+
+    def notify(msg, kind=ProgressEvent.INFO, **fields):
+        # Typed events for event_callback; status_callback still receives the plain message
+        if event_callback:
+            event_callback(ProgressEvent(kind, msg, completed=completed, total=total,
+                                         elapsed=time.perf_counter() - job_started, **fields))
+        if status_callback and root_instance:
+            root_instance.after(0, lambda msg=msg: status_callback(msg))
+        elif status_callback:
+            status_callback(msg)
+
+    def stopped():
+        return stop_event is not None and stop_event.is_set()
+
+    completed = 0
+
+    # Cancelled while still waiting in a queue
+    if stopped():
+        notify("🚫 Generation manually stopped.", ProgressEvent.CANCELLED)
+        return generated_files
     
     if not os.path.isdir(output_dir):
         try:
              os.makedirs(output_dir, exist_ok=True)
         except Exception as e:
-            if status_callback and root_instance:
-                 root_instance.after(0, lambda msg=f"❌ Error: Cannot create output directory {output_dir}. {e}": status_callback(msg))
-            is_generating = False
+            notify(f"❌ Error: Cannot create output directory {output_dir}. {e}", ProgressEvent.FAILED)
             return generated_files
 
-    for i, (speaker, text, voice_id) in enumerate(dialogue_list):
-        if stop_event and stop_event.is_set():
-            if status_callback and root_instance:
-                root_instance.after(0, lambda msg="🚫 Generation manually stopped.": status_callback(msg))
-            is_generating = False
-            return generated_files
+    backend = backend or EdgeTTSBackend()
+    extension, passthrough = resolve_output_format(backend.audio_format, output_format)
+    decode_lines = AUDIO_PROCESSING_AVAILABLE and not passthrough
+    filename_format = os.path.splitext(filename_format)[0] + extension
+    merged_filename = os.path.splitext(merged_filename)[0] + extension
+    # Keeps at most `max_concurrency` requests in flight across all lines, with rate limiting and retries;
+    # callers running several jobs pass one shared scheduler instead
+    scheduler = scheduler or RequestScheduler(max_concurrency, backend.rate_limit)
+    retries = 0
+    prosody = dict(DEFAULT_PROSODY, **(prosody or {}))
+
+    cache = None
+    if use_cache:
+        try:
+            cache = SynthesisCache(cache_dir, cache_max_bytes)
+        except OSError as e:
+            print(f"Synthesis cache disabled: {e}", file=sys.stderr)
+
+    loop = asyncio.get_running_loop()
 
+    def offload(fn, *args):
+        """Runs CPU-bound audio work on the shared worker pool, so synthesis requests keep flowing meanwhile."""
+        return loop.run_in_executor(audio_executor(), functools.partial(fn, *args))
+
+    async def synthesize_segment(text_value, voice_id, on_start=None, ssml=None):
+        """Returns the encoded audio for one text segment (or a whole SSML line), or None if the job was stopped."""
+        cache_key = SynthesisCache.make_key(ssml or text_value, voice_id, prosody, backend.name) if cache else None
+        audio_data = cache.get(cache_key) if cache else None
+        if audio_data is not None:
+            metrics.count("cache_hits")
+            if on_start: on_start()
+            return audio_data
+        if cache: metrics.count("cache_misses")
+
+        def on_retry(attempt, error):
+            nonlocal retries
+            retries += 1
+            metrics.count("retries")
+            print(f"Retrying '{text_value}' (attempt {attempt + 1}) after error: {error}", file=sys.stderr)
+
+        if ssml:
+            request = lambda: backend.synthesize_ssml(ssml, voice_id)
+        else:
+            request = lambda: backend.synthesize(text_value, voice_id, prosody)
+        with metrics.span("synthesize"):
+            audio_data = await scheduler.run(request, stop_event, on_start, on_retry)
+        if audio_data is not None:
+            metrics.count("requests")
+            metrics.count("bytes_synthesized", len(audio_data))
+            if cache: cache.put(cache_key, audio_data)
+        return audio_data
+
+    async def render_line(i, speaker, text, voice_id):
+        nonlocal completed
         display_name = get_voice_display_name(voice_id)
-        
-        if status_callback and root_instance:
-            root_instance.after(0, lambda msg=f"🟡 Generating audio {i+1}/{total} (Speaker:{display_name})": status_callback(msg))
+        announced = False
+
+        def announce():
+            nonlocal announced
+            if not announced:
+                announced = True
+                notify(f"🟡 Generating audio {i+1}/{total} (Speaker:{display_name})", ProgressEvent.LINE_STARTED, index=i+1)
+
+        output_line_file = line_files[i]
+
+        # Unchanged lines from the previous run are reused as-is
+        reused_file = manifest.reused.get(i+1) if manifest else None
+        if reused_file:
+            line_pcm = await offload(decode_audio, reused_file, sample_rate, metrics) \
+                if merged_writer or (on_line_ready and AUDIO_PROCESSING_AVAILABLE) else None
+            metrics.count("lines_reused")
+            completed += 1
+            notify(f"🟢 Reused audio {i+1}/{total} from previous run ({completed} of {total} done)",
+                   ProgressEvent.LINE_DONE, index=i+1, reused=True, file=reused_file)
+            return reused_file, line_pcm
 
         segments = []
-        last_index = 0
-        
-        for m in pause_pattern.finditer(text):
-            start, end = m.span()
-            if start>last_index: segments.append(("text", text[last_index:start]))
-            segments.append(("pause", float(m.group(1))))
-            last_index = end
-        if last_index < len(text): segments.append(("text", text[last_index:]))
-
-        temp_files_for_line = []
-        for j, (seg_type, value) in enumerate(segments):
-            if stop_event and stop_event.is_set():
-                if status_callback and root_instance:
-                    root_instance.after(0, lambda msg="🚫 Generation manually stopped.": status_callback(msg))
-                is_generating = False
-                return generated_files
+        for seg_type, value in split_pause_segments(text):
+            if seg_type != "text":
+                segments.append((seg_type, value))
+                continue
+            # Long text is split at sentence/clause boundaries; the chunks are requested concurrently
+            for k, chunk in enumerate(chunk_text(value, max_chunk_chars)):
+                if k and chunk_gap > 0: segments.append(("pause", chunk_gap))
+                segments.append(("text", chunk))
+        fits_one_request = not max_chunk_chars or len(PAUSE_PATTERN.sub("", text).strip()) <= max_chunk_chars
+        if coalesce_pauses and backend.supports_ssml and fits_one_request and \
+                any(seg_type == "pause" for seg_type, _ in segments):
+            # One request for the whole line, with the pauses as SSML <break> elements
+            segments = [("ssml", build_ssml(segments, voice_id, prosody))]
 
+        # Slots keep script order; text slots are filled with audio bytes by the concurrent requests below
+        line_sources = [None] * len(segments)
+        pending = []
+        for j, (seg_type, value) in enumerate(segments):
             if seg_type=="text" and value.strip():
-                temp_filename = os.path.join(tempfile.gettempdir(), f"tts_{os.urandom(6).hex()}_seg{j}.wav")
-                
-                try:
-                    tts = edge_tts.Communicate(value.strip(), voice=voice_id)
-                    await tts.save(temp_filename)
-                    temp_files_for_line.append(temp_filename)
-                except Exception as e:
-                    print(f"TTS Generation Error: {e}")
-                    if status_callback and root_instance:
-                        root_instance.after(0, lambda msg=f"❌ Error: Audio generation failed for line {i+1} text '{value.strip()}'.": status_callback(msg))
-                    for f in temp_files_for_line:
-                        if os.path.exists(f): os.unlink(f)
-                    temp_files_for_line = []
-                    break
-                    
+                pending.append((j, value.strip(), None))
+            elif seg_type=="ssml":
+                pending.append((j, text.strip(), value))
             elif seg_type=="pause":
-                silence_file = create_silence_wav(value)
-                if silence_file:
-                    temp_files_for_line.append(silence_file)
-                elif status_callback and root_instance:
-                    root_instance.after(0, lambda msg=f"⚠️ Warning: Cannot generate silence for line {i+1}. Please install librosa/soundfile.": status_callback(msg))
+                with metrics.span("silence"):
+                    line_sources[j] = silence_samples(value, sample_rate) if decode_lines else value
+        metrics.count("segments", len(segments))
 
-        
-        if not temp_files_for_line: continue
+        async def synthesize_text(j, text_value, ssml):
+            line_sources[j] = await synthesize_segment(text_value, voice_id, announce, ssml)
 
-        safe_speaker_name = re.sub(r'[^\w\s-]', '', display_name.replace(' ', '_'))
-        output_line_file_base = filename_format.format(index=i+1, speaker=safe_speaker_name)
-        output_line_file = os.path.join(output_dir, output_line_file_base)
+        results = await asyncio.gather(*(synthesize_text(*p) for p in pending), return_exceptions=True)
+        # Requests that were still queued when STOP was pressed leave the line incomplete
+        failed = next((r for r in results if isinstance(r, BaseException)), None)
+        if failed is not None or stopped():
+            if failed is not None:
+                metrics.count("lines_failed")
+                print(f"TTS Generation Error: {failed}", file=sys.stderr)
+                notify(f"❌ Error: Audio generation failed for line {i+1} text '{text.strip()}'.",
+                       ProgressEvent.LINE_FAILED, index=i+1)
+            return None, None
+
+        line_sources = [src for src in line_sources if src is not None]
+        if not line_sources: return None, None
+
+        line_file = None
+        line_pcm = None
         
-        if len(temp_files_for_line)>1:
-            if merge_wav_files(temp_files_for_line, output_line_file):
-                generated_files.append(output_line_file)
-            for f in temp_files_for_line:
-                if os.path.exists(f): 
-                    try: os.unlink(f)
-                    except OSError: pass
-        elif len(temp_files_for_line) == 1:
-            old_filename = temp_files_for_line[0]
-            if os.path.exists(old_filename):
-                try:
-                    os.rename(old_filename, output_line_file)
-                    generated_files.append(output_line_file)
-                except OSError:
-                    try:
-                        shutil.copy(old_filename, output_line_file)
-                        os.unlink(old_filename)
-                        generated_files.append(output_line_file)
-                    except Exception as e:
-                        print(f"File move/copy failed: {e}")
-                        
-        if status_callback and root_instance:
-            root_instance.after(0, lambda msg=f"🟢 Completed audio {i+1}/{total}": status_callback(msg))
+        def decode_and_write():
+            pcm = np.concatenate([src if isinstance(src, np.ndarray) else decode_audio(src, sample_rate, metrics)
+                                  for src in line_sources])
+            with metrics.span("line_write"):
+                sf.write(output_line_file, pcm, sample_rate)
+            return pcm
 
-    if stop_event and stop_event.is_set():
-        if status_callback and root_instance:
-            root_instance.after(0, lambda msg="🚫 Generation manually stopped.": status_callback(msg))
-        is_generating = False
+        def write_encoded():
+            with metrics.span("line_write"):
+                write_encoded_line(output_line_file, line_sources, backend.audio_format)
+            if on_line_ready and AUDIO_PROCESSING_AVAILABLE:
+                return decode_audio(output_line_file, sample_rate, metrics)  # Only the preview needs PCM
+            return None
+
+        if decode_lines:
+            # Each segment is decoded exactly once; the same buffer feeds the line file and the merged file
+            try:
+                line_pcm = await offload(decode_and_write)
+                line_file = output_line_file
+            except Exception as e:
+                print(f"Error writing line {i+1}: {e}", file=sys.stderr)
+                line_pcm = None
+        else:
+            # Without a decoder (or for MP3 passthrough) the encoded segments are stitched as-is
+            try:
+                line_pcm = await offload(write_encoded)
+                line_file = output_line_file
+            except (OSError, wave.Error) as e:
+                print(f"Error writing line {i+1}: {e}", file=sys.stderr)
+
+        if line_file and manifest:
+            # Checkpoint: a rerun with resume=True reuses this line while its text is unchanged
+            try:
+                duration = len(line_pcm) / sample_rate if line_pcm is not None and decode_lines else None
+                manifest.record(i+1, speaker, text, voice_id, line_file, duration)
+            except OSError as e:
+                print(f"Error updating manifest: {e}", file=sys.stderr)
+
+        if line_file: metrics.count("bytes_written", os.path.getsize(line_file))
+        metrics.count("lines_completed")
+        completed += 1
+        notify(f"🟢 Completed audio {i+1}/{total} ({completed} of {total} done)", ProgressEvent.LINE_DONE,
+               index=i+1, file=line_file)
+        return line_file, line_pcm
+
+    def line_file_name(i, voice_id):
+        safe_speaker_name = re.sub(r'[^\w\s-]', '', get_voice_display_name(voice_id).replace(' ', '_'))
+        return os.path.join(output_dir, filename_format.format(index=i+1, speaker=safe_speaker_name))
+
+    notify(f"▶️ Started generating {total} audios in {output_dir}", ProgressEvent.STARTED)
+    line_files = [line_file_name(i, voice_id) for i, (_, _, voice_id) in enumerate(dialogue_list)]
+    manifest = None
+    try:
+        manifest = JobManifest(output_dir, {"filename_format": filename_format, "backend": backend.name,
+                                            "prosody": prosody, "sample_rate": sample_rate,
+                                            "decoded": decode_lines},
+                               lines=dialogue_list if resume else None, line_files=line_files)
+        if manifest.reused:
+            notify(f"♻️ Reusing {len(manifest.reused)} unchanged line(s) from the previous run; "
+                   f"{total - len(manifest.reused)} to generate")
+    except OSError as e:
+        print(f"Manifest disabled: {e}", file=sys.stderr)
+
+    final_merged_file = os.path.join(output_dir, merged_filename)
+    merged_writer = None
+    if merge_files and decode_lines:
+        try:
+            # post_process: LinePostProcessor options (trim, line_gap, ...) applied to the merged file only
+            post_processor = LinePostProcessor(sample_rate, **post_process) if post_process is not None else None
+            # normalize_loudness: target LUFS. Lines are measured as they are decoded; per-speaker gains are
+            # only known once every line is in, so the writer holds the lines (spilled once as raw PCM) and
+            # writes them with their gain in one pass at the end
+            merged_writer = OrderedPcmWriter(final_merged_file, sample_rate, post_processor,
+                                             hold=normalize_loudness is not None)
+        except Exception as e:
+            print(f"Error opening merged output: {e}", file=sys.stderr)
+    loudness_meter = LoudnessMeter(sample_rate, normalize_loudness) \
+        if merged_writer and normalize_loudness is not None else None
+    # The merged writer keeps state between lines, so only one worker feeds it at a time
+    merge_lock = asyncio.Lock()
+
+    def measure_line(speaker, line_pcm):
+        with metrics.span("loudness"):
+            loudness_meter.add(speaker, line_pcm)
+
+    def stream_line(i, line_pcm, speaker):
+        with metrics.span("merge_stream"):
+            merged_writer.add(i, line_pcm, speaker)
+
+    # Lines enter the window in script order (the semaphore is FIFO) and leave it once handed to the writer
+    render_window = asyncio.Semaphore(max(DEFAULT_RENDER_WINDOW, 2 * max_concurrency))
+
+    async def render_and_merge(i, speaker, text, voice_id):
+        async with render_window:
+            line_file, line_pcm = await render_line(i, speaker, text, voice_id)
+            if loudness_meter:
+                await offload(measure_line, speaker, line_pcm)
+            if merged_writer:
+                async with merge_lock:
+                    await offload(stream_line, i, line_pcm, speaker)
+            # e.g. PreviewPlayer.add: the decoded buffer is handed over without re-encoding
+            if on_line_ready: on_line_ready(i, line_pcm)
+        return line_file
+
+    try:
+        line_results = await asyncio.gather(*(render_and_merge(i, speaker, text, voice_id)
+                                              for i, (speaker, text, voice_id) in enumerate(dialogue_list)))
+    finally:
+        if manifest: manifest.close()
+    # gather() preserves argument order, so files stay in script order however the requests finished
+    generated_files = [f for f in line_results if f]
+
+    def export_metrics():
+        metrics.observe("job", time.perf_counter() - job_started)
+        try:
+            with open(os.path.join(output_dir, "tts_metrics.json"), "w", encoding="utf-8") as f:
+                f.write(metrics.to_json() + "\n")
+        except OSError as e:
+            print(f"Error writing metrics: {e}", file=sys.stderr)
+
+    if stopped():
+        if merged_writer: merged_writer.discard()
+        export_metrics()
+        notify("🚫 Generation manually stopped.", ProgressEvent.CANCELLED)
         return generated_files
 
     if merge_files and generated_files:
-        if status_callback and root_instance:
-            root_instance.after(0, lambda msg="🔄 Merging all audio files...": status_callback(msg))
+        notify("🔄 Merging all audio files...", ProgressEvent.MERGING)
         
-        final_merged_file = os.path.join(output_dir, merged_filename)
-        merge_success = merge_wav_files(generated_files, final_merged_file)
+        gains = loudness_meter.gains() if loudness_meter else None
+        if gains:
+            for speaker, lufs in sorted(loudness_meter.loudness().items()):
+                if lufs is not None:
+                    notify(f"🔊 Speaker {speaker}: {lufs:.1f} LUFS, gain {20 * math.log10(gains[speaker]):+.1f} dB")
+
+        def merge():
+            with metrics.span("merge"):
+                if merged_writer:
+                    # Lines were already streamed into the merged file as they finished, or held for their gains
+                    if merged_writer.hold: merged_writer.release(gains)
+                    merged_writer.close()
+                    return merged_writer.frames > 0
+                if passthrough:
+                    return merge_mp3_files(generated_files, final_merged_file)
+                return merge_wav_files(generated_files, final_merged_file, sample_rate, metrics=metrics)
+
+        # Runs on a worker thread so other jobs on this loop keep synthesizing
+        merge_success = await offload(merge)
+        if merge_success: metrics.count("bytes_written", os.path.getsize(final_merged_file))
+        export_metrics()
+        cache_status = f", cache: {cache.hits} hits / {cache.misses} misses" if cache else ""
+        cache_status += f", {retries} retries" if retries else ""
         
-        if merge_success and status_callback and root_instance:
+        if merge_success:
             
             # --- New logic: Check delete_singles flag ---
             if delete_singles:
@@ -260,24 +1675,344 @@ async def generate_individual_audios(dialogue_list, status_callback=None, output
             else:
                 cleanup_status = "and singles kept"
             
-            root_instance.after(0, lambda msg=f"🎉 All {total} audios generated and merged to {os.path.basename(final_merged_file)} ({cleanup_status}) in {output_dir}!": status_callback(msg))
+            notify(f"🎉 All {total} audios generated and merged to {os.path.basename(final_merged_file)} ({cleanup_status}{cache_status}) in {output_dir}!",
+                   ProgressEvent.DONE, file=final_merged_file, stats=metrics.summary()["counters"])
+        else:
+            notify(f"❌ Error: Failed to merge audio files into {os.path.basename(final_merged_file)}.", ProgressEvent.FAILED)
             
     else:
-        if status_callback and root_instance:
-            root_instance.after(0, lambda msg=f"🎉 All {total} audios generated to directory: {output_dir}": status_callback(msg))
+        if merged_writer: merged_writer.discard()
+        cache_status = f" (cache: {cache.hits} hits / {cache.misses} misses)" if cache else ""
+        cache_status += f" ({retries} retries)" if retries else ""
+        export_metrics()
+        notify(f"🎉 All {total} audios generated to directory: {output_dir}{cache_status}", ProgressEvent.DONE,
+               stats=metrics.summary()["counters"])
 
-    is_generating = False
     return generated_files
 
+# --- Job Scheduling ---
+
+class ConcurrencyLimiter:
+    """Async semaphore with an AIMD-adjusted limit.
+
+    The limit grows by one per window of successful requests and halves on a failure or a
+    latency spike (at most once per cooldown), staying between min_limit and max_limit.
+    Create and use it on a single event loop; change max_limit from other threads via
+    loop.call_soon_threadsafe(limiter.set_limit, n).
+    """
+
+    def __init__(self, limit=DEFAULT_MAX_CONCURRENCY, min_limit=1, latency_spike_factor=3.0,
+                 decrease_cooldown=1.0):
+        self.max_limit = max(1, int(limit))
+        self.min_limit = max(1, min(int(min_limit), self.max_limit))
+        self.limit = float(self.max_limit)
+        self.latency_spike_factor = latency_spike_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.in_flight = 0
+        self.latency_ewma = None
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._condition = None
+
+    def _get_condition(self):
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def set_limit(self, limit):
+        self.max_limit = max(1, int(limit))
+        self.min_limit = min(self.min_limit, self.max_limit)
+        self.limit = float(self.max_limit)
+        asyncio.ensure_future(self._wake_waiters())
+
+    def record_success(self, latency):
+        self._successes += 1
+        spike = (self.latency_ewma is not None and self._successes > 5
+                 and latency > self.latency_spike_factor * self.latency_ewma)
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+        if spike:
+            self._decrease()
+        elif self.limit < self.max_limit:
+            previous = int(self.limit)
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            if int(self.limit) > previous:
+                asyncio.ensure_future(self._wake_waiters())
+
+    def record_failure(self):
+        self._decrease()
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self._last_decrease < self.decrease_cooldown: return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit / 2)
+
+    async def _wake_waiters(self):
+        condition = self._get_condition()
+        async with condition:
+            condition.notify_all()
+
+    async def __aenter__(self):
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        condition = self._get_condition()
+        async with condition:
+            self.in_flight -= 1
+            condition.notify()
+
+class TokenBucket:
+    """Async token-bucket rate limiter; a rate of None disables it."""
+
+    def __init__(self, rate_per_second=DEFAULT_REQUEST_RATE, burst=None):
+        self.rate = rate_per_second
+        self.capacity = float(burst or max(1.0, rate_per_second or 1.0))
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = None
+
+    async def acquire(self):
+        if not self.rate: return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+def is_transient_error(exc):
+    """Network, timeout and service errors worth retrying; anything else fails immediately."""
+    if isinstance(exc, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    return type(exc).__module__.split(".")[0] in ("aiohttp", "edge_tts")
+
+class RequestScheduler:
+    """Runs synthesis requests under a token-bucket rate limit and AIMD concurrency.
+
+    Transient failures are retried with full-jitter exponential backoff; each failure also
+    shrinks the concurrency limit so a throttling service gets room to recover.
+    """
+
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY, rate_per_second=DEFAULT_REQUEST_RATE,
+                 burst=None, max_retries=DEFAULT_MAX_RETRIES, backoff_base=0.5, backoff_cap=30.0):
+        self.limiter = ConcurrencyLimiter(max_concurrency)
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.retries = 0
+
+    def set_max_concurrency(self, max_concurrency):
+        self.limiter.set_limit(max_concurrency)
+
+    async def run(self, request, stop_event=None, on_start=None, on_retry=None):
+        """Awaits request() until it succeeds; returns None if stop_event is set first."""
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            async with self.limiter:
+                if stop_event is not None and stop_event.is_set(): return None
+                if on_start: on_start()
+                started = time.perf_counter()
+                try:
+                    result = await request()
+                except Exception as e:
+                    # Permanent errors (e.g. an unknown voice) say nothing about service load
+                    if not is_transient_error(e):
+                        raise
+                    self.limiter.record_failure()
+                    if attempt == self.max_retries:
+                        raise
+                    error = e
+                else:
+                    self.limiter.record_success(time.perf_counter() - started)
+                    return result
+            self.retries += 1
+            if on_retry: on_retry(attempt + 1, error)
+            delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+            if await wait_for_stop(stop_event, delay): return None
+
+async def wait_for_stop(stop_event, timeout):
+    """Sleeps up to timeout seconds, returning True as soon as the (threading) stop_event is set."""
+    deadline = time.perf_counter() + timeout
+    while True:
+        if stop_event is not None and stop_event.is_set():
+            return True
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return False
+        await asyncio.sleep(min(remaining, STOP_POLL_INTERVAL) if stop_event is not None else remaining)
+
+class Job:
+    """One queued dialogue render with its own cancel token."""
+
+    def __init__(self, job_id, dialogue_list, status_callback, options):
+        self.job_id = job_id
+        self.dialogue_list = dialogue_list
+        self.status_callback = status_callback
+        self.options = options
+        self.state = "queued"  # queued -> running -> done / cancelled / failed
+        self.result = []
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.done_event = threading.Event()
+        self.metrics = JobMetrics()
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def done(self):
+        return self.done_event.is_set()
+
+class JobManager:
+    """Queues dialogue jobs and runs them on one background event loop.
+
+    Up to max_parallel_jobs jobs run at once, and all of them share one budget of
+    max_concurrency in-flight requests through one RequestScheduler. submit() returns immediately with a job id,
+    so the GUI and programmatic callers never block while other jobs are running.
+    """
+
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY, max_parallel_jobs=DEFAULT_MAX_PARALLEL_JOBS,
+                 rate_per_second=DEFAULT_REQUEST_RATE):
+        self.max_parallel_jobs = max(1, int(max_parallel_jobs))
+        self.scheduler = RequestScheduler(max_concurrency, rate_per_second)
+        self._jobs = {}
+        self._job_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._loop = None
+        self._job_slots = None
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                ready = threading.Event()
+
+                def run_loop():
+                    loop = asyncio.new_event_loop()
+                    asyncio.set_event_loop(loop)
+                    self._job_slots = asyncio.Semaphore(self.max_parallel_jobs)
+                    self._loop = loop
+                    ready.set()
+                    loop.run_forever()
+
+                threading.Thread(target=run_loop, name="tts-job-manager", daemon=True).start()
+                ready.wait()
+            return self._loop
+
+    def submit(self, dialogue_list, status_callback=None, **options):
+        """Queues a job; options are passed on to generate_individual_audios. Returns the job id.
+
+        Raises ValueError if a queued or running job already writes to the same output directory,
+        since the two would overwrite each other's line files, manifest and merged output.
+        """
+        loop = self._ensure_loop()
+        with self._lock:
+            busy = self._job_using_output_dir(options.get("output_dir", "."))
+            if busy is not None:
+                raise ValueError(f"Output directory {options.get('output_dir', '.')} is already used by job {busy.job_id}")
+            job = Job(next(self._job_ids), dialogue_list, status_callback, options)
+            self._jobs[job.job_id] = job
+        asyncio.run_coroutine_threadsafe(self._run(job), loop)
+        return job.job_id
+
+    async def _run(self, job):
+        options = dict(job.options)
+        event_callback = options.get("event_callback")
+        if event_callback:
+            # Events carry the job id so one consumer can follow several jobs
+            def tag_event(event):
+                event.job_id = job.job_id
+                event_callback(event)
+            options["event_callback"] = tag_event
+        async with self._job_slots:
+            job.state = "running"
+            job.started_at = time.time()
+            try:
+                job.result = await generate_individual_audios(job.dialogue_list, job.status_callback,
+                                                              stop_event=job.cancel_event, scheduler=self.scheduler,
+                                                              metrics=job.metrics, **options)
+                job.state = "cancelled" if job.cancel_event.is_set() else "done"
+            except Exception as e:
+                print(f"Job {job.job_id} failed: {e}", file=sys.stderr)
+                job.error = e
+                job.state = "failed"
+                if event_callback:
+                    options["event_callback"](ProgressEvent(ProgressEvent.FAILED, f"❌ Error: Job failed: {e}"))
+            finally:
+                job.finished_at = time.time()
+                job.done_event.set()
+
+    def _job_using_output_dir(self, output_dir):
+        # Caller holds self._lock
+        key = os.path.normcase(os.path.abspath(output_dir))
+        return next((job for job in self._jobs.values() if not job.done and
+                     os.path.normcase(os.path.abspath(job.options.get("output_dir", "."))) == key), None)
+
+    def free_output_dir(self, output_dir):
+        """Returns output_dir, or its first numbered subfolder (run_2, run_3, ...) that no active job uses."""
+        with self._lock:
+            candidate, n = output_dir, 1
+            while self._job_using_output_dir(candidate) is not None:
+                n += 1
+                candidate = os.path.join(output_dir, f"run_{n}")
+            return candidate
+
+    def get(self, job_id):
+        return self._jobs[job_id]
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def active_jobs(self):
+        return [job for job in self.jobs() if not job.done]
+
+    def cancel(self, job_id):
+        self._jobs[job_id].cancel()
+
+    def cancel_all(self):
+        for job in self.active_jobs():
+            job.cancel()
+
+    def wait(self, job_id, timeout=None):
+        """Blocks until the job finishes and returns its generated files (None on timeout)."""
+        job = self._jobs[job_id]
+        return job.result if job.done_event.wait(timeout) else None
+
+    def set_max_concurrency(self, max_concurrency):
+        """Changes the shared request budget; waiting requests pick up the new limit immediately."""
+        if self._loop is None:
+            limiter = self.scheduler.limiter
+            limiter.max_limit = max(1, int(max_concurrency))
+            limiter.min_limit = min(limiter.min_limit, limiter.max_limit)
+            limiter.limit = float(limiter.max_limit)
+        else:
+            self._loop.call_soon_threadsafe(self.scheduler.set_max_concurrency, max_concurrency)
+
+# Shared by the GUI; scripts importing this module can queue work on it as well
+job_manager = JobManager()
+
 # --- GUI Function (Major Changes for English and new Feature) ---
 def get_dialogue_from_gui(root, generate_callback, stop_callback):
-    
-    global global_stop_event
-    global is_generating
+    import tkinter as tk
+    from tkinter import scrolledtext, messagebox, filedialog
+    from tkinter import ttk  # Import ttk for themed widgets
     
     # --- GUI Style Configuration ---
     root.title("TTS Dialogue Audio Generator (Edge-TTS)")
-    root.geometry("850x850") 
+    root.geometry("850x970") 
     root.resizable(False, False)
     
     # Define Tahoma font for consistency and clarity
@@ -298,14 +2033,7 @@ def get_dialogue_from_gui(root, generate_callback, stop_callback):
     default_output_dir = os.path.join(os.path.expanduser("~"), "Desktop", "TTS_Output")
     output_dir_var = tk.StringVar(value=default_output_dir)
     
-    speaker_voice_vars = {
-        'A': tk.StringVar(value="Ryan (UK, Default)"),
-        'B': tk.StringVar(value="Jenny (US, Default)"),
-        'C': tk.StringVar(value="Christopher (US)"),
-        'D': tk.StringVar(value="Ana (US)"),
-        'E': tk.StringVar(value="Libby (UK)"),
-        'F': tk.StringVar(value="Guy (US, Default)"),
-    }
+    speaker_voice_vars = {s: tk.StringVar(value=name) for s, name in DEFAULT_SPEAKER_VOICES.items()}
     
     now = datetime.datetime.now()
     default_filename = now.strftime("%Y%m%d_%H%M")
@@ -315,6 +2043,9 @@ def get_dialogue_from_gui(root, generate_callback, stop_callback):
     
     merged_filename_var = tk.StringVar(value=f"{default_filename}_merged.wav")
     filename_format_var = tk.StringVar(value="{index}_{speaker}.wav")
+    concurrency_var = tk.IntVar(value=DEFAULT_MAX_CONCURRENCY)
+    resume_var = tk.BooleanVar(value=False)
+    preview_var = tk.BooleanVar(value=False)
     status_message = tk.StringVar(value="Ready...") 
 
     all_voice_names = []
@@ -394,6 +2125,23 @@ def get_dialogue_from_gui(root, generate_callback, stop_callback):
     ttk.Label(output_setting_frame, text="Single File Format ({index}, {speaker}):").grid(row=4, column=0, padx=5, pady=5, sticky="w")
     ttk.Entry(output_setting_frame, textvariable=filename_format_var, width=40, font=FONT_TAHOMA).grid(row=4, column=1, sticky="w", padx=5)
 
+    # Parallel Edge-TTS requests
+    ttk.Label(output_setting_frame, text="Parallel Requests:").grid(row=5, column=0, padx=5, pady=5, sticky="w")
+    ttk.Spinbox(output_setting_frame, from_=1, to=16, textvariable=concurrency_var, width=5,
+                state="readonly", font=FONT_TAHOMA).grid(row=5, column=1, sticky="w", padx=5)
+
+    # Reuse unchanged lines recorded in the save directory's manifest (interrupted or edited scripts)
+    resume_check = ttk.Checkbutton(output_setting_frame, text="Incremental: reuse unchanged lines from the previous run in this folder", 
+                                   variable=resume_var)
+    resume_check.grid(row=6, column=0, columnspan=2, padx=5, pady=5, sticky="w")
+
+    # Play lines as soon as they are ready (decoded buffers, needs pygame)
+    preview_available = PLAYBACK_AVAILABLE and AUDIO_PROCESSING_AVAILABLE
+    preview_check = ttk.Checkbutton(output_setting_frame, variable=preview_var,
+                                    text="Preview: play lines in order as they finish" + ("" if preview_available else " (requires pygame, librosa, soundfile)"),
+                                    state=tk.NORMAL if preview_available else tk.DISABLED)
+    preview_check.grid(row=7, column=0, columnspan=2, padx=5, pady=5, sticky="w")
+
     # --- 4. Status and Operation Area ---
     
     # Status Label
@@ -405,9 +2153,13 @@ def get_dialogue_from_gui(root, generate_callback, stop_callback):
     button_frame = ttk.Frame(main_frame)
     button_frame.grid(row=4, column=0, padx=10, pady=(0, 10))
     
+    # Jobs this window has queued that have not finished yet
+    active_job_ids = set()
+
     def on_stop_button_click():
-        if is_generating:
-            global_stop_event.set()
+        if active_job_ids:
+            for job_id in list(active_job_ids):
+                stop_callback(job_id)
             stop_button.config(state=tk.DISABLED)
             status_message.set("🚫 Requesting generation stop, please wait...")
             progress_label.config(foreground="red")
@@ -416,10 +2168,6 @@ def get_dialogue_from_gui(root, generate_callback, stop_callback):
     stop_button.pack(side=tk.RIGHT, padx=10)
     
     def on_generate_button_click():
-        global is_generating
-        
-        if is_generating: return
-        
         output_dir = output_dir_var.get()
         # Basic directory validation
         if not output_dir or not os.path.isdir(os.path.dirname(output_dir) if output_dir.endswith(('.wav', '.mp3')) else output_dir):
@@ -431,84 +2179,285 @@ def get_dialogue_from_gui(root, generate_callback, stop_callback):
             messagebox.showwarning("Input Error", "Dialogue content cannot be empty!")
             return
             
-        lines = [L.strip() for L in dialogue_text.splitlines() if L.strip()]
-        parsed = []
-        selected_voices = {s: voice_id_map.get(v.get(), "en-US-JennyNeural") 
+        selected_voices = {s: voice_id_map.get(v.get(), FALLBACK_VOICE_ID) 
                           for s,v in speaker_voice_vars.items()}
-                          
-        for line in lines:
-            if ":" in line:
-                s,t = line.split(":",1)
-                speaker_id = s.strip().upper()
-                if speaker_id in speaker_voice_vars:
-                    voice_to_use = selected_voices.get(speaker_id, "en-US-JennyNeural")
-                    parsed.append((speaker_id, t.strip(), voice_to_use))
-                else:
-                    messagebox.showwarning("Input Warning", f"Skipping invalid Speaker ID: {speaker_id}")
+        parsed, skipped_speakers = parse_dialogue(dialogue_text, selected_voices)
+        for speaker_id in skipped_speakers:
+            messagebox.showwarning("Input Warning", f"Skipping invalid Speaker ID: {speaker_id}")
             
         if not parsed: 
             messagebox.showwarning("Input Error", "No valid dialogue parsed (Ensure format: Speaker: Text, and Speaker is A-F)")
             return
             
-        global_stop_event.clear()
-        is_generating = True
-        generate_button.config(state=tk.DISABLED)
+        # Queue the job; it starts as soon as the job manager has a free slot
+        job_id = generate_callback(parsed, None, output_dir_var.get(), filename_format_var.get(), 
+                                   merge_option_var.get(), merged_filename_var.get(), voice_id_map, None, 
+                                   delete_singles_var.get(), concurrency_var.get(), resume_var.get(),
+                                   preview_var.get(), event_callback=progress_channel.put)
+        active_job_ids.add(job_id)
         stop_button.config(state=tk.NORMAL)
-        
-        def progress_callback(msg):
-            status_message.set(msg)
-            
-            if "🎉" in msg or "🚫" in msg or "❌" in msg:
-                global_stop_event.clear()
-                generate_button.config(state=tk.NORMAL)
+        status_message.set(f"Job {job_id}: total {len(parsed)} audios queued ({len(active_job_ids)} job(s) active).")
+        progress_label.config(foreground="blue")
+
+    # Jobs report typed events from the worker thread; the window applies them at a capped refresh rate
+    progress_channel = ProgressChannel()
+
+    def apply_progress_event(event):
+        status_message.set(f"[Job {event.job_id}] {event.message}" if len(active_job_ids) > 1 else event.message)
+        if event.terminal:
+            active_job_ids.discard(event.job_id)
+            if not active_job_ids:
                 stop_button.config(state=tk.DISABLED)
-                
-                if "🎉" in msg:
-                    progress_label.config(foreground="green")
-                    messagebox.showinfo("Generation Complete", msg)
-                elif "🚫" in msg:
-                    progress_label.config(foreground="red")
-                elif "❌" in msg:
-                    progress_label.config(foreground="red")
-                    messagebox.showerror("Generation Error", msg)
-            elif "🟡" in msg or "🔄" in msg:
-                progress_label.config(foreground="orange")
-            elif "🟢" in msg:
-                progress_label.config(foreground="green")
+
+        if event.kind == ProgressEvent.DONE:
+            progress_label.config(foreground="green")
+            failed_lines = event.stats.get("lines_failed", 0)
+            if failed_lines:
+                messagebox.showwarning("Generation Complete", f"Job {event.job_id}: {event.message}\n\n{failed_lines} line(s) failed.")
             else:
-                progress_label.config(foreground="blue")
-                
-        progress_text = f"Total {len(parsed)} audios to generate. Starting..."
-        progress_callback(progress_text)
+                messagebox.showinfo("Generation Complete", f"Job {event.job_id}: {event.message}")
+        elif event.kind == ProgressEvent.FAILED:
+            progress_label.config(foreground="red")
+            messagebox.showerror("Generation Error", f"Job {event.job_id}: {event.message}")
+        elif event.kind in (ProgressEvent.CANCELLED, ProgressEvent.LINE_FAILED):
+            progress_label.config(foreground="red")
+        elif event.kind in (ProgressEvent.LINE_STARTED, ProgressEvent.MERGING):
+            progress_label.config(foreground="orange")
+        elif event.kind == ProgressEvent.LINE_DONE:
+            progress_label.config(foreground="green")
+        else:
+            progress_label.config(foreground="blue")
 
-        # Pass the new 'delete_singles_var' value to the worker function
-        generate_callback(parsed, progress_callback, output_dir_var.get(), filename_format_var.get(), 
-                          merge_option_var.get(), merged_filename_var.get(), voice_id_map, root, global_stop_event, 
-                          delete_singles_var.get())
+    def poll_progress():
+        for event in progress_channel.drain():
+            apply_progress_event(event)
+        root.after(PROGRESS_REFRESH_MS, poll_progress)
+
+    poll_progress()
 
     generate_button = ttk.Button(button_frame, text="▶️ GENERATE Audio", style="TButton", command=on_generate_button_click)
     generate_button.pack(side=tk.LEFT, padx=10)
 
 
-# Start Generation Thread
+# Queue a generation job on the shared job manager
 def start_gui_generation(dialogue_list, status_set_callback, output_dir, filename_format, merge_option, 
-                         merged_filename, voice_id_map=None, root_instance=None, stop_event=None, delete_singles=True): # ADDED delete_singles
-    def wrapper():
-        asyncio.run(generate_individual_audios(dialogue_list, status_set_callback, output_dir, filename_format, 
-                                               root_instance=root_instance, merge_files=merge_option, 
-                                               merged_filename=merged_filename, voice_id_map=voice_id_map, 
-                                               stop_event=stop_event, delete_singles=delete_singles)) # Pass the flag
-    threading.Thread(target=wrapper, daemon=True).start()
+                         merged_filename, voice_id_map=None, root_instance=None, delete_singles=True, # ADDED delete_singles
+                         max_concurrency=DEFAULT_MAX_CONCURRENCY, resume=False, preview=False, event_callback=None):
+    # The request budget is shared by every queued job
+    job_manager.set_max_concurrency(max_concurrency)
+    # The window's folder and file names stay the same between clicks, so a job queued while another
+    # one still writes to that folder gets its own subfolder instead of overwriting its files
+    output_dir = job_manager.free_output_dir(output_dir)
+    player = PreviewPlayer(len(dialogue_list)) if preview else None
+    job_id = job_manager.submit(dialogue_list, status_set_callback, output_dir=output_dir, filename_format=filename_format, 
+                                root_instance=root_instance, merge_files=merge_option, 
+                                merged_filename=merged_filename, voice_id_map=voice_id_map, 
+                                delete_singles=delete_singles, resume=resume, # Pass the flag
+                                on_line_ready=player.add if player else None, event_callback=event_callback,
+                                # A merged filename ending in .mp3 selects MP3 output
+                                output_format="mp3" if merged_filename.lower().endswith(".mp3") else "wav")
+    if player:
+        # STOP silences the preview as well; a finished job lets the remaining lines play out
+        job = job_manager.get(job_id)
+        player.stop_event, player.done_event = job.cancel_event, job.done_event
+    return job_id
+
+# --- Headless Batch Mode ---
+
+def load_speaker_voices(config_path=None):
+    """Returns the speaker -> voice id mapping, with overrides from a JSON config file ({"voices": {"A": ...}})."""
+    speaker_voices = {s: resolve_voice_id(name) for s, name in DEFAULT_SPEAKER_VOICES.items()}
+    if config_path:
+        with open(config_path, encoding="utf-8") as f:
+            config = json.load(f)
+        for speaker_id, voice in config.get("voices", {}).items():
+            speaker_voices[speaker_id.strip().upper()] = resolve_voice_id(voice)
+    return speaker_voices
+
+def collect_script_files(paths):
+    """Expands directories into the .txt scripts they contain, keeping the given order."""
+    script_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            script_files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                       if name.lower().endswith(".txt")))
+        else:
+            script_files.append(path)
+    return script_files
+
+def render_scripts(script_files, output_root, speaker_voices, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                   merge_files=True, delete_singles=False, use_cache=True, cache_dir=DEFAULT_CACHE_DIR,
+                   quiet=False, backend=None, resume=False, coalesce_pauses=True,
+                   max_chunk_chars=DEFAULT_MAX_CHUNK_CHARS, chunk_gap=DEFAULT_CHUNK_GAP, output_format="wav",
+                   sample_rate=DEFAULT_SAMPLE_RATE, post_process=None, normalize_loudness=None,
+                   max_parallel_jobs=DEFAULT_MAX_PARALLEL_JOBS):
+    """Queues every script as a job and waits for all of them; the jobs share one cap on in-flight requests.
+
+    At most max_parallel_jobs scripts render at once (each holds its output files open); the rest wait in the queue.
+    """
+    backend = backend or EdgeTTSBackend()
+    manager = JobManager(max_concurrency, max_parallel_jobs=max_parallel_jobs, rate_per_second=backend.rate_limit)
+    queued = []
+
+    for script_file in script_files:
+        name = os.path.splitext(os.path.basename(script_file))[0]
+        output_dir = os.path.join(output_root, name)
+        merged_filename = f"{name}_merged" + resolve_output_format(backend.audio_format, output_format)[0]
+        result = {"script": script_file, "output_dir": output_dir, "lines": 0, "files": [],
+                  "merged": None, "seconds": 0.0, "status": "ok", "messages": []}
+
+        def report(msg, error=False, name=name, result=result):
+            if error or msg.startswith("⚠️"):
+                result["messages"].append(msg)
+            if error: result["status"] = "error"
+            if not quiet: print(f"[{name}] {msg}", file=sys.stderr)
+
+        def on_event(event, report=report):
+            report(event.message, error=event.kind in (ProgressEvent.LINE_FAILED, ProgressEvent.FAILED))
+
+        try:
+            with open(script_file, encoding="utf-8-sig") as f:
+                parsed, skipped_speakers = parse_dialogue(f.read(), speaker_voices)
+        except (OSError, UnicodeDecodeError) as e:
+            result["status"] = "error"
+            result["messages"].append(f"❌ Error: {e}")
+            queued.append((result, None, None))
+            continue
+        for speaker_id in skipped_speakers:
+            report(f"⚠️ Warning: Skipping invalid Speaker ID: {speaker_id}")
+        result["lines"] = len(parsed)
+        if not parsed:
+            result["status"] = "error"
+            result["messages"].append("❌ Error: No valid dialogue parsed")
+            queued.append((result, None, None))
+            continue
+        try:
+            job_id = manager.submit(parsed, None, event_callback=on_event, output_dir=output_dir, merge_files=merge_files,
+                                    merged_filename=merged_filename, delete_singles=delete_singles,
+                                    use_cache=use_cache, cache_dir=cache_dir, backend=backend, resume=resume,
+                                    coalesce_pauses=coalesce_pauses, max_chunk_chars=max_chunk_chars,
+                                    chunk_gap=chunk_gap, output_format=output_format, sample_rate=sample_rate,
+                                    post_process=post_process, normalize_loudness=normalize_loudness)
+        except ValueError as e:
+            # e.g. two scripts with the same name in different directories
+            result["status"] = "error"
+            result["messages"].append(f"❌ Error: {e}")
+            queued.append((result, None, None))
+            continue
+        queued.append((result, job_id, os.path.join(output_dir, merged_filename)))
+
+    for result, job_id, merged_path in queued:
+        if job_id is None: continue
+        manager.wait(job_id)
+        job = manager.get(job_id)
+        result["files"] = job.result
+        result["seconds"] = round(job.finished_at - job.started_at, 3)
+        result["metrics"] = job.metrics.summary()
+        if merge_files and os.path.exists(merged_path):
+            result["merged"] = merged_path
+        if job.state != "done" or \
+                (merge_files and not result["merged"]) or \
+                (not merge_files and len(result["files"]) != result["lines"]):
+            result["status"] = "error"
+    return [result for result, _, _ in queued]
+
+def run_cli(argv):
+    import argparse
+    parser = argparse.ArgumentParser(description="Render dialogue scripts to audio without the GUI. "
+                                                 "Prints a JSON summary of outputs and timings to stdout.")
+    parser.add_argument("scripts", nargs="+", help="Dialogue script files (.txt) or directories containing them")
+    parser.add_argument("-o", "--output-dir", default=os.path.join(os.getcwd(), "TTS_Output"),
+                        help="Root output directory; each script renders into its own subdirectory")
+    parser.add_argument("-c", "--config", help="JSON config file overriding speaker voices, e.g. {\"voices\": {\"A\": \"en-US-GuyNeural\"}}")
+    parser.add_argument("-j", "--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="Edge-TTS requests in flight across all scripts (default: %(default)s)")
+    parser.add_argument("--parallel-scripts", type=int, default=DEFAULT_MAX_PARALLEL_JOBS,
+                        help="Scripts rendered at once; the rest wait in the queue (default: %(default)s)")
+    parser.add_argument("--format", choices=("wav", "mp3"), default="wav",
+                        help="Output format; mp3 from Edge-TTS is merged by copying frames without re-encoding (default: %(default)s)")
+    parser.add_argument("--sample-rate", type=int, default=DEFAULT_SAMPLE_RATE,
+                        help="Sample rate of decoded (WAV) output in Hz (default: %(default)s)")
+    parser.add_argument("--no-merge", action="store_true", help="Only write one file per line")
+    parser.add_argument("--delete-singles", action="store_true", help="Delete line files after a successful merge")
+    parser.add_argument("--resume", action="store_true",
+                        help="Reuse unchanged lines from the previous run in each output directory and synthesize only new or edited ones")
+    parser.add_argument("--split-pauses", action="store_true",
+                        help="Synthesize the text around each pause separately even if the backend accepts SSML breaks")
+    parser.add_argument("--max-chunk-chars", type=int, default=DEFAULT_MAX_CHUNK_CHARS,
+                        help="Split longer text at sentence/clause boundaries into concurrent requests; 0 disables (default: %(default)s)")
+    parser.add_argument("--chunk-gap", type=float, default=DEFAULT_CHUNK_GAP,
+                        help="Seconds of silence between the chunks of a split line (default: %(default)s)")
+    parser.add_argument("--trim-silence", action="store_true",
+                        help="Trim leading and trailing silence from each line in the merged file")
+    parser.add_argument("--line-gap", type=float,
+                        help="Seconds of silence between lines in the merged file (default with any of these options: 0.25)")
+    parser.add_argument("--speaker-gap", type=float,
+                        help="Seconds of silence where the speaker changes (default: same as --line-gap, or 0.5)")
+    parser.add_argument("--crossfade", type=float,
+                        help="Seconds of fade at each join; with a zero gap the lines overlap by this much (default: 0.01)")
+    parser.add_argument("--normalize", nargs="?", type=float, const=DEFAULT_TARGET_LUFS, metavar="LUFS",
+                        help=f"Bring every speaker to the same loudness in the merged file (default target: {DEFAULT_TARGET_LUFS} LUFS)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the synthesis cache")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Synthesis cache directory")
+    parser.add_argument("--backend", choices=sorted(TTS_BACKENDS), default="edge",
+                        help="Synthesis backend; 'stub' renders deterministic tones offline (default: %(default)s)")
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="Stub backend: seconds per request")
+    parser.add_argument("--stub-error-rate", type=float, default=0.0, help="Stub backend: fraction of failing requests")
+    parser.add_argument("--prometheus", metavar="FILE",
+                        help="Also write per-script stage timings and counters in Prometheus text format")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Suppress progress messages on stderr")
+    args = parser.parse_args(argv)
+    backend_options = {"latency": args.stub_latency, "error_rate": args.stub_error_rate} if args.backend == "stub" else {}
+    post_process = None
+    if args.trim_silence or any(v is not None for v in (args.line_gap, args.speaker_gap, args.crossfade)):
+        post_process = {"trim": args.trim_silence}
+        if args.line_gap is not None: post_process["line_gap"] = post_process["speaker_gap"] = args.line_gap
+        if args.speaker_gap is not None: post_process["speaker_gap"] = args.speaker_gap
+        if args.crossfade is not None: post_process["crossfade"] = args.crossfade
+
+    started = time.perf_counter()
+    script_files = collect_script_files(args.scripts)
+    speaker_voices = load_speaker_voices(args.config)
+    results = render_scripts(script_files, args.output_dir, speaker_voices, args.max_concurrency,
+                             merge_files=not args.no_merge, delete_singles=args.delete_singles,
+                             use_cache=not args.no_cache, cache_dir=args.cache_dir, quiet=args.quiet,
+                             backend=create_backend(args.backend, **backend_options), resume=args.resume,
+                             coalesce_pauses=not args.split_pauses, max_chunk_chars=args.max_chunk_chars,
+                             chunk_gap=args.chunk_gap, output_format=args.format, sample_rate=args.sample_rate,
+                             post_process=post_process, normalize_loudness=args.normalize,
+                             max_parallel_jobs=args.parallel_scripts)
+    summary = {
+        "ok": bool(results) and all(r["status"] == "ok" for r in results),
+        "scripts": results,
+        "total_seconds": round(time.perf_counter() - started, 3),
+    }
+    if args.prometheus:
+        try:
+            with open(args.prometheus, "w", encoding="utf-8") as f:
+                f.write(prometheus_text([({"script": os.path.basename(r["script"])}, r["metrics"])
+                                         for r in results if "metrics" in r]))
+        except OSError as e:
+            print(f"Error writing metrics: {e}", file=sys.stderr)
+    json.dump(summary, sys.stdout, ensure_ascii=False, indent=2)
+    print()
+    return 0 if summary["ok"] else 1
 
 # Main function
 async def main():
+    import tkinter as tk
     root = tk.Tk()
-    get_dialogue_from_gui(root, start_gui_generation, global_stop_event.set)
+    get_dialogue_from_gui(root, start_gui_generation, job_manager.cancel)
+    # Load the audio stack in the background once the window is drawn
+    root.after_idle(lambda: threading.Thread(target=warm_audio_imports, daemon=True).start())
     root.mainloop()
 
 if __name__=="__main__":
     if sys.platform == "win32":
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    # Any command-line arguments select the headless batch mode
+    if len(sys.argv) > 1:
+        sys.exit(run_cli(sys.argv[1:]))
         
     default_output_dir = os.path.join(os.path.expanduser("~"), "Desktop", "TTS_Output")
     if not os.path.exists(default_output_dir):